@@ -4,14 +4,20 @@ Main Bot Client for Serena Forward.
 
 import logging
 from datetime import datetime
-from typing import Dict, Optional
+import asyncio
+from typing import Any, Dict, List, Optional
 
 from pyrogram import Client, idle
-from pyrogram.types import BotCommand
+from pyrogram.types import BotCommand, Message
 
 from config import Config
 from bot.database import Database
-from bot.helpers.queue_manager import QueueManager
+from bot.helpers.queue_manager import QueueManager, Task, TaskStatus
+from bot.helpers.flood_control import FloodScheduler
+from bot.helpers.forwarder import BatchForwarder
+from bot.helpers.client_pool import UserClientPool
+from bot.helpers.broadcaster import Broadcaster
+from bot.helpers.cleanup import CleanupManager
 
 logger = logging.getLogger(__name__)
 
@@ -41,17 +47,25 @@ class SerenaBot(Client):
         # Database connection
         self.db: Optional[Database] = None
         
-        # User clients for session management
-        self.user_clients: Dict[int, Client] = {}
-        
         # Queue manager for batch tasks
         self.queue_manager: QueueManager = QueueManager()
         
+        # User clients, connected on demand and evicted when idle
+        self.user_clients: UserClientPool = UserClientPool(
+            is_busy=self.queue_manager.has_active_task
+        )
+        
+        # Send pacing shared by all user clients
+        self.flood_scheduler: FloodScheduler = FloodScheduler()
+        
         # Active tasks tracking
         self.active_tasks: Dict[int, dict] = {}
         
-        # Rate limiting cache
-        self.rate_limit_cache: Dict[int, list] = {}
+        # Running broadcast, if any
+        self.broadcaster: Optional[Broadcaster] = None
+        
+        # Background maintenance tasks
+        self._background_tasks: list = []
     
     async def start(self):
         """Start the bot and initialize all components."""
@@ -63,11 +77,29 @@ class SerenaBot(Client):
         # Start the bot
         await super().start()
         
+        # Build missing indexes while the bot is already serving
+        self._background_tasks.append(asyncio.create_task(self.db.ensure_indexes()))
+        
+        # Start batch workers with checkpointing
+        self.queue_manager.store = self.db.tasks
+        self._background_tasks.append(asyncio.create_task(self.db.tasks.run_flusher()))
+        self._background_tasks.append(asyncio.create_task(self.db.users.run_flusher()))
+        await self.queue_manager.start()
+        
         # Set bot commands
         await self.set_bot_commands()
         
-        # Load existing user sessions
-        await self.load_user_sessions()
+        # User clients connect on demand from stored sessions
+        self.user_clients.sessions = self.db.sessions
+        self._background_tasks.append(asyncio.create_task(self.db.sessions.load_active_ids()))
+        self._background_tasks.append(asyncio.create_task(self.user_clients.run_evictor()))
+        
+        # Expire stale downloads and thumbnail cache entries
+        self._background_tasks.append(asyncio.create_task(CleanupManager.run_scheduled_cleanup()))
+        
+        # Resume interrupted batches and broadcasts without holding up command handling
+        self._background_tasks.append(asyncio.create_task(self.resume_tasks()))
+        self._background_tasks.append(asyncio.create_task(self.resume_broadcasts()))
         
         # Get bot info
         me = await self.get_me()
@@ -89,13 +121,22 @@ class SerenaBot(Client):
         """Graceful shutdown."""
         logger.info("Shutting down bot...")
         
+        try:
+            # Stop batch workers; a stuck transfer must not hold up the flushes below
+            await self.queue_manager.stop()
+            
+            for task in self._background_tasks:
+                task.cancel()
+        finally:
+            # Persist buffered checkpoints and user activity
+            if self.db and self.db.tasks:
+                await self.db.tasks.flush()
+            
+            if self.db and self.db.users:
+                await self.db.users.flush()
+        
         # Close all user clients
-        for user_id, client in self.user_clients.items():
-            try:
-                await client.stop()
-                logger.info(f"Closed client for user {user_id}")
-            except Exception as e:
-                logger.error(f"Error closing client for user {user_id}: {e}")
+        await self.user_clients.stop_all()
         
         # Close database connection
         if self.db:
@@ -117,38 +158,152 @@ class SerenaBot(Client):
             BotCommand("stats", "View bot statistics"),
         ]
         
-        await self.set_bot_commands(commands)
+        await super().set_bot_commands(commands)
         logger.info("Bot commands set successfully")
     
-    async def load_user_sessions(self):
-        """Load all active user sessions from database."""
+    async def load_user_sessions(self, user_ids: List[int]):
+        """
+        Connect the given users' clients ahead of time.
+        
+        Every other client is connected lazily by the pool on first use.
+        """
         try:
-            sessions = await self.db.sessions.get_all_active_sessions()
+            await self.user_clients.warm(user_ids)
+            logger.info(f"Loaded {len(self.user_clients)}/{len(set(user_ids))} user sessions")
+        except Exception as e:
+            logger.error(f"Error loading user sessions: {e}")
+    
+    async def submit_batch(
+        self,
+        task: Task,
+        status_message: Optional[Message] = None,
+        settings: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """
+        Queue a batch task on the worker pool.
+        
+        Args:
+            task: Task to run
+            status_message: Message to update with batch progress
+            settings: User settings, fetched if not given
             
-            for session_data in sessions:
-                user_id = session_data.get("user_id")
-                session_string = session_data.get("session_string")
+        Returns:
+            Queue position (1 = next to run)
+        """
+        if settings is None:
+            settings = await self.db.settings.get_settings(task.user_id)
+        
+        forwarder = BatchForwarder(
+            user_client=self.user_clients.get(task.user_id),
+            task=task,
+            queue_manager=self.queue_manager,
+            status_message=status_message,
+            settings=settings,
+            scheduler=self.flood_scheduler,
+            media_cache=self.db.media_cache
+        )
+        
+        return await self.queue_manager.submit(task.user_id, forwarder)
+    
+    async def resume_tasks(self):
+        """Resume batch tasks that were pending or running at shutdown."""
+        try:
+            docs = await self.db.tasks.get_resumable_tasks()
+            resumed = 0
+            
+            # Only the owners of interrupted batches need a client right away
+            await self.load_user_sessions([doc["user_id"] for doc in docs])
+            
+            for doc in docs:
+                task = Task.from_doc(doc)
+                
+                if not self.queue_manager.restore_task(task):
+                    # Another task of this user is active; close this one so it is not retried forever
+                    logger.warning(
+                        f"Dropping interrupted task {task.task_id}: "
+                        f"user {task.user_id} already has an active task"
+                    )
+                    task.status = TaskStatus.CANCELLED
+                    task.completed_at = datetime.now()
+                    task.error_message = "Superseded by another task after restart"
+                    self.db.tasks.checkpoint(task.to_doc())
+                    continue
+                
+                if task.user_id not in self.user_clients:
+                    self.queue_manager.fail_task(task.user_id, "Session not active after restart")
+                    continue
                 
-                if user_id and session_string:
-                    try:
-                        client = Client(
-                            name=f"user_{user_id}",
-                            api_id=Config.API_ID,
-                            api_hash=Config.API_HASH,
-                            session_string=session_string,
-                            in_memory=True
-                        )
-                        await client.start()
-                        self.user_clients[user_id] = client
-                        logger.info(f"Loaded session for user {user_id}")
-                    except Exception as e:
-                        logger.error(f"Failed to load session for user {user_id}: {e}")
-                        # Mark session as invalid
-                        await self.db.sessions.invalidate_session(user_id)
+                status_msg = None
+                try:
+                    status_msg = await self.send_message(
+                        task.user_id,
+                        f"♻️ **Batch Resumed**\n\n"
+                        f"The bot restarted while your batch was running.\n"
+                        f"✅ Processed: {task.current}/{task.total_messages}\n\n"
+                        f"Use /cancel to stop."
+                    )
+                    task.status_message_id = status_msg.id
+                except Exception as e:
+                    logger.warning(f"Could not notify user {task.user_id} about resumed task: {e}")
+                
+                await self.submit_batch(task, status_msg)
+                resumed += 1
             
-            logger.info(f"Loaded {len(self.user_clients)} user sessions")
+            if docs:
+                logger.info(f"Resumed {resumed}/{len(docs)} interrupted batch tasks")
         except Exception as e:
-            logger.error(f"Error loading user sessions: {e}")
+            logger.error(f"Error resuming tasks: {e}")
+    
+    async def start_broadcast(
+        self,
+        broadcast: dict,
+        status_message: Optional[Message] = None
+    ):
+        """
+        Run a broadcast in the background.
+        
+        Args:
+            broadcast: Broadcast document from BroadcastsDB
+            status_message: Message to update with live progress
+        """
+        self.broadcaster = Broadcaster(self, broadcast, status_message)
+        
+        async def run():
+            try:
+                await self.broadcaster.run()
+            finally:
+                self.broadcaster = None
+        
+        self._background_tasks.append(asyncio.create_task(run()))
+    
+    async def resume_broadcasts(self):
+        """Resume a broadcast that was running at shutdown."""
+        try:
+            docs = await self.db.broadcasts.get_resumable()
+            
+            # Sorted oldest first; only one broadcast runs at a time, so the
+            # newest one is resumed and older duplicates are dropped
+            for doc in docs[:-1]:
+                await self.db.broadcasts.checkpoint(doc["broadcast_id"], status="cancelled")
+            
+            if not docs:
+                return
+            
+            broadcast = docs[-1]
+            status_msg = None
+            try:
+                status_msg = await self.send_message(
+                    broadcast["created_by"],
+                    "♻️ **Broadcast Resumed**\n\n"
+                    "The bot restarted while a broadcast was running."
+                )
+            except Exception as e:
+                logger.warning(f"Could not notify about resumed broadcast: {e}")
+            
+            await self.start_broadcast(broadcast, status_msg)
+            logger.info(f"Resumed broadcast {broadcast['broadcast_id']}")
+        except Exception as e:
+            logger.error(f"Error resuming broadcasts: {e}")
     
     def get_uptime(self) -> str:
         """Get bot uptime as formatted string."""
@@ -6,5 +6,9 @@ from .mongodb import Database
 from .users import UsersDB
 from .sessions import SessionsDB
 from .settings_db import SettingsDB
+from .tasks import TasksDB
+from .broadcasts import BroadcastsDB
+from .media_cache import MediaCacheDB
 
-__all__ = ["Database", "UsersDB", "SessionsDB", "SettingsDB"]
+__all__ = ["Database", "UsersDB", "SessionsDB", "SettingsDB", "TasksDB", "BroadcastsDB",
+           "MediaCacheDB"]
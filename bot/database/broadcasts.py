@@ -0,0 +1,99 @@
+"""
+Broadcast progress persistence.
+"""
+
+import logging
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+logger = logging.getLogger(__name__)
+
+
+class BroadcastsDB:
+    """
+    Broadcast database operations manager.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        """Initialize broadcasts database manager."""
+        self.collection = db.broadcasts
+
+    async def create(
+        self,
+        broadcast_id: str,
+        from_chat_id: int,
+        message_id: int,
+        created_by: int
+    ) -> bool:
+        """
+        Record a new broadcast.
+
+        Args:
+            broadcast_id: Unique broadcast identifier
+            from_chat_id: Chat holding the message to broadcast
+            message_id: Message to broadcast
+            created_by: Owner who started the broadcast
+
+        Returns:
+            True if successful
+        """
+        try:
+            await self.collection.insert_one({
+                "broadcast_id": broadcast_id,
+                "from_chat_id": from_chat_id,
+                "message_id": message_id,
+                "created_by": created_by,
+                "status": "running",
+                "last_user_id": None,
+                "sent": 0,
+                "failed": 0,
+                "blocked": 0,
+                "status_message_id": None,
+                "created_at": datetime.utcnow(),
+                "updated_at": datetime.utcnow()
+            })
+            return True
+        except Exception as e:
+            logger.error(f"Error creating broadcast {broadcast_id}: {e}")
+            return False
+
+    async def checkpoint(self, broadcast_id: str, **fields: Any) -> bool:
+        """
+        Save broadcast progress.
+
+        Args:
+            broadcast_id: Broadcast identifier
+            **fields: Fields to update (last_user_id, sent, status, ...)
+
+        Returns:
+            True if successful
+        """
+        try:
+            fields["updated_at"] = datetime.utcnow()
+            await self.collection.update_one(
+                {"broadcast_id": broadcast_id},
+                {"$set": fields}
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error saving broadcast {broadcast_id} progress: {e}")
+            return False
+
+    async def get_broadcast(self, broadcast_id: str) -> Optional[Dict[str, Any]]:
+        """Get a broadcast by ID."""
+        try:
+            return await self.collection.find_one({"broadcast_id": broadcast_id}, {"_id": 0})
+        except Exception as e:
+            logger.error(f"Error getting broadcast {broadcast_id}: {e}")
+            return None
+
+    async def get_resumable(self) -> List[Dict[str, Any]]:
+        """Get broadcasts that were running when the bot stopped."""
+        try:
+            cursor = self.collection.find({"status": "running"}, {"_id": 0}).sort("created_at", 1)
+            return await cursor.to_list(length=None)
+        except Exception as e:
+            logger.error(f"Error getting resumable broadcasts: {e}")
+            return []
@@ -0,0 +1,94 @@
+"""
+Uploaded media cache for reusing files across batches.
+"""
+
+import logging
+from datetime import datetime
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+logger = logging.getLogger(__name__)
+
+
+class MediaCacheDB:
+    """
+    Maps a source file to the file_id of its re-upload.
+
+    Entries are keyed by the source's file_unique_id and the account that
+    uploaded the copy, since a file_id can only be sent by the account it
+    was issued to (but to any chat).
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        """Initialize media cache database manager."""
+        self.collection = db.media_cache
+
+    async def get_file_id(self, user_id: int, file_unique_id: str) -> Optional[str]:
+        """
+        Get the file_id of an earlier upload of a source file.
+
+        Args:
+            user_id: Account that uploaded the copy
+            file_unique_id: Source file's unique ID
+
+        Returns:
+            Reusable file_id or None
+        """
+        try:
+            entry = await self.collection.find_one(
+                {"file_unique_id": file_unique_id, "user_id": user_id},
+                {"_id": 0, "file_id": 1}
+            )
+            return entry["file_id"] if entry else None
+        except Exception as e:
+            logger.error(f"Error reading media cache for {file_unique_id}: {e}")
+            return None
+
+    async def save(
+        self,
+        user_id: int,
+        file_unique_id: str,
+        file_id: str,
+        chat_id: int
+    ) -> bool:
+        """
+        Remember the upload of a source file.
+
+        Args:
+            user_id: Account that uploaded the copy
+            file_unique_id: Source file's unique ID
+            file_id: file_id of the uploaded copy
+            chat_id: Chat the copy was uploaded to
+
+        Returns:
+            True if successful
+        """
+        try:
+            await self.collection.update_one(
+                {"file_unique_id": file_unique_id, "user_id": user_id},
+                {
+                    "$set": {
+                        "file_id": file_id,
+                        "chat_id": chat_id,
+                        "updated_at": datetime.utcnow()
+                    },
+                    "$setOnInsert": {"created_at": datetime.utcnow()}
+                },
+                upsert=True
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error saving media cache for {file_unique_id}: {e}")
+            return False
+
+    async def forget(self, user_id: int, file_unique_id: str) -> bool:
+        """Drop an entry whose file_id no longer works."""
+        try:
+            result = await self.collection.delete_one(
+                {"file_unique_id": file_unique_id, "user_id": user_id}
+            )
+            return result.deleted_count > 0
+        except Exception as e:
+            logger.error(f"Error deleting media cache for {file_unique_id}: {e}")
+            return False
@@ -2,15 +2,84 @@
 MongoDB connection and database management.
 """
 
+import time
+import asyncio
 import logging
-from typing import Optional
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import IndexModel
 
 from config import Config
 
 logger = logging.getLogger(__name__)
 
+# Indexes per collection, derived from the queries the *DB classes issue
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel("user_id", unique=True),
+        IndexModel("username"),
+        IndexModel("joined_at"),
+        # get_active_users / iter_active_users
+        IndexModel("last_active"),
+    ],
+    "sessions": [
+        IndexModel("user_id", unique=True),
+        # get_session / has_active_session, covered for existence checks
+        IndexModel([("user_id", 1), ("is_active", 1)]),
+        # get_all_active_sessions / active session counts; only active ones are indexed
+        IndexModel(
+            "is_active",
+            name="is_active_partial",
+            partialFilterExpression={"is_active": True}
+        ),
+        IndexModel("created_at"),
+    ],
+    "settings": [
+        IndexModel("user_id", unique=True),
+    ],
+    "global_settings": [
+        IndexModel("key", unique=True),
+    ],
+    "tasks": [
+        IndexModel("task_id", unique=True),
+        IndexModel("user_id"),
+        # get_resumable_tasks and status counts, sorted by creation
+        IndexModel([("status", 1), ("created_at", 1)]),
+        IndexModel("created_at"),
+    ],
+    "broadcasts": [
+        IndexModel("broadcast_id", unique=True),
+        IndexModel([("status", 1), ("created_at", 1)]),
+    ],
+    "media_cache": [
+        IndexModel([("file_unique_id", 1), ("user_id", 1)], unique=True),
+    ],
+}
+
+# Indexes superseded by the ones above, dropped if still present
+OBSOLETE_INDEXES: Dict[str, List[str]] = {
+    "sessions": ["is_active_1"],
+    "tasks": ["status_1"],
+    "broadcasts": ["status_1"],
+}
+
+# Representative hot-path queries checked with explain() at startup
+QUERY_SHAPES: List[Tuple[str, dict]] = [
+    ("users", {"user_id": 0}),
+    ("users", {"last_active": {"$gte": datetime(1970, 1, 1)}}),
+    ("sessions", {"user_id": 0, "is_active": True}),
+    ("sessions", {"is_active": True}),
+    ("settings", {"user_id": 0}),
+    ("global_settings", {"key": ""}),
+    ("tasks", {"task_id": ""}),
+    ("tasks", {"status": {"$in": ["pending", "running"]}}),
+    ("tasks", {"status": "completed"}),
+    ("broadcasts", {"status": "running"}),
+    ("media_cache", {"file_unique_id": "", "user_id": 0}),
+]
+
 
 class Database:
     """
@@ -26,6 +95,14 @@ class Database:
         self.users: Optional["UsersDB"] = None
         self.sessions: Optional["SessionsDB"] = None
         self.settings: Optional["SettingsDB"] = None
+        self.tasks: Optional["TasksDB"] = None
+        self.broadcasts: Optional["BroadcastsDB"] = None
+        self.media_cache: Optional["MediaCacheDB"] = None
+        
+        # Cached statistics (served stale while a refresh runs)
+        self._stats: Optional[dict] = None
+        self._stats_at: float = 0.0
+        self._stats_refresh: Optional[asyncio.Task] = None
     
     async def connect(self):
         """Establish database connection."""
@@ -44,13 +121,19 @@ class Database:
             from .users import UsersDB
             from .sessions import SessionsDB
             from .settings_db import SettingsDB
+            from .tasks import TasksDB
+            from .broadcasts import BroadcastsDB
+            from .media_cache import MediaCacheDB
+            
+            # Derive the session key off the event loop before first use
+            await SessionsDB.prepare_cipher()
             
             self.users = UsersDB(self.db)
             self.sessions = SessionsDB(self.db)
             self.settings = SettingsDB(self.db)
-            
-            # Create indexes
-            await self._create_indexes()
+            self.tasks = TasksDB(self.db)
+            self.broadcasts = BroadcastsDB(self.db)
+            self.media_cache = MediaCacheDB(self.db)
             
             logger.info(f"Connected to MongoDB: {Config.MONGO_DB_NAME}")
             
@@ -58,31 +141,85 @@ class Database:
             logger.error(f"Failed to connect to MongoDB: {e}")
             raise
     
-    async def _create_indexes(self):
-        """Create database indexes for optimal performance."""
-        try:
-            # Users collection indexes
-            await self.db.users.create_index("user_id", unique=True)
-            await self.db.users.create_index("username")
-            await self.db.users.create_index("joined_at")
-            
-            # Sessions collection indexes
-            await self.db.sessions.create_index("user_id", unique=True)
-            await self.db.sessions.create_index("is_active")
-            await self.db.sessions.create_index("created_at")
-            
-            # Settings collection indexes
-            await self.db.settings.create_index("user_id", unique=True)
-            
-            # Tasks collection indexes
-            await self.db.tasks.create_index("user_id")
-            await self.db.tasks.create_index("status")
-            await self.db.tasks.create_index("created_at")
-            
-            logger.info("Database indexes created successfully")
-            
-        except Exception as e:
-            logger.warning(f"Error creating indexes: {e}")
+    async def ensure_indexes(self):
+        """
+        Create missing indexes on all collections concurrently.
+        
+        Not part of connect(): the bot calls this in the background once it
+        is online, so index builds never delay startup.
+        """
+        results = await asyncio.gather(
+            *(
+                self._ensure_collection_indexes(name, models)
+                for name, models in INDEXES.items()
+            ),
+            return_exceptions=True
+        )
+        
+        created = 0
+        for name, result in zip(INDEXES, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Error creating indexes on {name}: {result}")
+            else:
+                created += result
+        
+        logger.info(f"Database indexes ready ({created} created)")
+        
+        # Only meaningful once the indexes exist
+        await self.check_query_plans()
+    
+    async def _ensure_collection_indexes(self, name: str, models: List[IndexModel]) -> int:
+        """Create the indexes of one collection that do not exist yet."""
+        collection = self.db[name]
+        existing = await collection.index_information()
+        
+        missing = [m for m in models if m.document["name"] not in existing]
+        if missing:
+            await collection.create_indexes(missing)
+        
+        for index_name in OBSOLETE_INDEXES.get(name, []):
+            if index_name in existing:
+                await collection.drop_index(index_name)
+                logger.info(f"Dropped obsolete index {name}.{index_name}")
+        
+        return len(missing)
+    
+    async def check_query_plans(self) -> List[str]:
+        """
+        Explain the hot-path queries and log any that scan a whole collection.
+        
+        Returns:
+            Descriptions of queries that fell back to COLLSCAN
+        """
+        scans = []
+        
+        for name, query in QUERY_SHAPES:
+            try:
+                plan = await self.db[name].find(query).explain()
+                winning = plan.get("queryPlanner", {}).get("winningPlan", {})
+                
+                if self._has_stage(winning, "COLLSCAN"):
+                    scans.append(f"{name}.find({query})")
+            except Exception as e:
+                logger.debug(f"Could not explain {name}.find({query}): {e}")
+        
+        for scan in scans:
+            logger.warning(f"Query falls back to COLLSCAN: {scan}")
+        
+        return scans
+    
+    @classmethod
+    def _has_stage(cls, plan: dict, stage: str) -> bool:
+        """Check whether a query plan tree contains a stage."""
+        if plan.get("stage") == stage:
+            return True
+        
+        children = list(plan.get("inputStages", []))
+        for key in ("inputStage", "queryPlan"):
+            if key in plan:
+                children.append(plan[key])
+        
+        return any(cls._has_stage(child, stage) for child in children)
     
     async def close(self):
         """Close database connection."""
@@ -91,11 +228,43 @@ class Database:
             logger.info("Database connection closed")
     
     async def get_stats(self) -> dict:
-        """Get database statistics."""
-        stats = {
-            "users": await self.db.users.count_documents({}),
-            "active_sessions": await self.db.sessions.count_documents({"is_active": True}),
-            "total_tasks": await self.db.tasks.count_documents({}),
-            "completed_tasks": await self.db.tasks.count_documents({"status": "completed"})
-        }
-        return stats
+        """
+        Get database statistics.
+        
+        Results are cached for STATS_CACHE_TTL seconds. After that the
+        cached value is still returned while a refresh runs in the background.
+        """
+        if self._stats is None:
+            return await self._refresh_stats()
+        
+        expired = time.monotonic() - self._stats_at > Config.STATS_CACHE_TTL
+        if expired and not (self._stats_refresh and not self._stats_refresh.done()):
+            self._stats_refresh = asyncio.create_task(self._refresh_stats())
+        
+        return dict(self._stats)
+    
+    async def _refresh_stats(self) -> dict:
+        """Recompute statistics with one query per collection, run concurrently."""
+        try:
+            # Totals come from collection metadata, filtered counts from indexes
+            users, active_sessions, total_tasks, completed_tasks = await asyncio.gather(
+                self.db.users.estimated_document_count(),
+                self.db.sessions.count_documents({"is_active": True}),
+                self.db.tasks.estimated_document_count(),
+                self.db.tasks.count_documents({"status": "completed"})
+            )
+            
+            self._stats = {
+                "users": users,
+                "active_sessions": active_sessions,
+                "total_tasks": total_tasks,
+                "completed_tasks": completed_tasks
+            }
+            self._stats_at = time.monotonic()
+            
+        except Exception as e:
+            logger.error(f"Error refreshing stats: {e}")
+            if self._stats is None:
+                raise
+        
+        return dict(self._stats)
@@ -2,10 +2,12 @@
 Session database operations with encryption.
 """
 
+import asyncio
 import logging
 import base64
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from functools import lru_cache
+from typing import Optional, List, Dict, Any, AsyncIterator, Set
 
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
@@ -16,6 +18,21 @@ from config import Config
 
 logger = logging.getLogger(__name__)
 
+# Sessions decrypted per thread pool job during bulk loads
+DECRYPT_CHUNK_SIZE = 50
+
+
+@lru_cache(maxsize=4)
+def _derive_key(secret: str) -> bytes:
+    """Derive the Fernet key from the configured secret (PBKDF2, cached per process)."""
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=b"serena_forward_salt",
+        iterations=100000
+    )
+    return base64.urlsafe_b64encode(kdf.derive(secret.encode()))
+
 
 class SessionsDB:
     """
@@ -26,21 +43,22 @@ class SessionsDB:
         """Initialize sessions database manager."""
         self.collection = db.sessions
         self._cipher = self._init_cipher()
+        
+        # User IDs with an active session, mirrored in memory once loaded.
+        # This process is the only writer, so the set stays authoritative.
+        self._active_ids: Optional[Set[int]] = None
+        # Changes made before the set finished loading
+        self._pending: Dict[int, bool] = {}
+    
+    @staticmethod
+    async def prepare_cipher():
+        """Derive the encryption key in a worker thread so startup never blocks the loop."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, _derive_key, Config.SESSION_ENCRYPTION_KEY)
     
     def _init_cipher(self) -> Fernet:
         """Initialize Fernet cipher for session encryption."""
-        key = Config.SESSION_ENCRYPTION_KEY.encode()
-        
-        # Derive a proper key using PBKDF2
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=b"serena_forward_salt",
-            iterations=100000
-        )
-        
-        derived_key = base64.urlsafe_b64encode(kdf.derive(key))
-        return Fernet(derived_key)
+        return Fernet(_derive_key(Config.SESSION_ENCRYPTION_KEY))
     
     def _encrypt(self, data: str) -> str:
         """Encrypt session string."""
@@ -50,6 +68,48 @@ class SessionsDB:
         """Decrypt session string."""
         return self._cipher.decrypt(data.encode()).decode()
     
+    def _mark(self, user_id: int, active: bool):
+        """Record a session state change in the in-memory set."""
+        if self._active_ids is None:
+            self._pending[user_id] = active
+        elif active:
+            self._active_ids.add(user_id)
+        else:
+            self._active_ids.discard(user_id)
+    
+    async def load_active_ids(self) -> int:
+        """
+        Load the IDs of users with an active session into memory.
+        
+        Until this completes, has_active_session() queries MongoDB.
+        
+        Returns:
+            Number of active sessions loaded
+        """
+        try:
+            cursor = self.collection.find(
+                {"is_active": True},
+                {"_id": 0, "user_id": 1}
+            )
+            active_ids = {doc["user_id"] async for doc in cursor}
+            
+            # Apply saves/deletes that raced with the load
+            for user_id, active in self._pending.items():
+                if active:
+                    active_ids.add(user_id)
+                else:
+                    active_ids.discard(user_id)
+            
+            self._pending = {}
+            self._active_ids = active_ids
+            
+            logger.info(f"Loaded {len(active_ids)} active session IDs")
+            return len(active_ids)
+            
+        except Exception as e:
+            logger.error(f"Error loading active session IDs: {e}")
+            return 0
+    
     async def save_session(
         self,
         user_id: int,
@@ -87,6 +147,7 @@ class SessionsDB:
                 },
                 upsert=True
             )
+            self._mark(user_id, True)
             
             logger.info(f"Session saved for user {user_id}")
             return True
@@ -132,6 +193,7 @@ class SessionsDB:
         """
         try:
             result = await self.collection.delete_one({"user_id": user_id})
+            self._mark(user_id, False)
             
             if result.deleted_count > 0:
                 logger.info(f"Session deleted for user {user_id}")
@@ -158,6 +220,7 @@ class SessionsDB:
                 {"user_id": user_id},
                 {"$set": {"is_active": False, "invalidated_at": datetime.utcnow()}}
             )
+            self._mark(user_id, False)
             return result.modified_count > 0
             
         except Exception as e:
@@ -165,41 +228,98 @@ class SessionsDB:
             return False
     
     async def has_active_session(self, user_id: int) -> bool:
-        """Check if user has an active session."""
+        """
+        Check if user has an active session.
+        
+        Answered from memory once load_active_ids() has run; otherwise an
+        index-covered query that never reads the session blob.
+        """
+        if self._active_ids is not None:
+            return user_id in self._active_ids
+        
         try:
-            session = await self.collection.find_one({
-                "user_id": user_id,
-                "is_active": True
-            })
+            session = await self.collection.find_one(
+                {"user_id": user_id, "is_active": True},
+                {"_id": 0, "user_id": 1}
+            )
             return session is not None
             
         except Exception as e:
             logger.error(f"Error checking session for {user_id}: {e}")
             return False
     
+    def _decrypt_batch(self, sessions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Decrypt a batch of session documents (synchronous)."""
+        decrypted_sessions = []
+        for session in sessions:
+            try:
+                decrypted_sessions.append({
+                    "user_id": session["user_id"],
+                    "session_string": self._decrypt(session["session_string"]),
+                    "created_at": session.get("created_at")
+                })
+            except Exception as e:
+                logger.warning(f"Could not decrypt session for {session['user_id']}: {e}")
+        return decrypted_sessions
+    
     async def get_all_active_sessions(self) -> List[Dict[str, Any]]:
-        """Get all active sessions (decrypted)."""
+        """Get all active sessions (decrypted in a thread pool, in chunks)."""
         try:
-            cursor = self.collection.find({"is_active": True})
+            cursor = self.collection.find(
+                {"is_active": True},
+                {"user_id": 1, "session_string": 1, "created_at": 1}
+            )
             sessions = await cursor.to_list(length=None)
             
-            decrypted_sessions = []
-            for session in sessions:
-                try:
-                    decrypted_sessions.append({
-                        "user_id": session["user_id"],
-                        "session_string": self._decrypt(session["session_string"]),
-                        "created_at": session.get("created_at")
-                    })
-                except Exception as e:
-                    logger.warning(f"Could not decrypt session for {session['user_id']}: {e}")
+            loop = asyncio.get_running_loop()
+            chunks = await asyncio.gather(*(
+                loop.run_in_executor(
+                    None,
+                    self._decrypt_batch,
+                    sessions[i:i + DECRYPT_CHUNK_SIZE]
+                )
+                for i in range(0, len(sessions), DECRYPT_CHUNK_SIZE)
+            ))
             
-            return decrypted_sessions
+            return [session for chunk in chunks for session in chunk]
             
         except Exception as e:
             logger.error(f"Error getting active sessions: {e}")
             return []
     
+    async def iter_active_sessions(
+        self,
+        batch_size: int = DECRYPT_CHUNK_SIZE
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream active sessions, decrypting them as the cursor yields batches.
+        
+        Args:
+            batch_size: Documents fetched and decrypted per round
+            
+        Yields:
+            Decrypted session dictionaries
+        """
+        loop = asyncio.get_running_loop()
+        cursor = self.collection.find(
+            {"is_active": True},
+            {"user_id": 1, "session_string": 1, "created_at": 1},
+            batch_size=batch_size
+        )
+        
+        batch = []
+        async for session in cursor:
+            batch.append(session)
+            
+            if len(batch) >= batch_size:
+                for decrypted in await loop.run_in_executor(None, self._decrypt_batch, batch):
+                    yield decrypted
+                batch = []
+        
+        if batch:
+            for decrypted in await loop.run_in_executor(None, self._decrypt_batch, batch):
+                yield decrypted
+    
     async def get_active_session_count(self) -> int:
         """Get count of active sessions."""
         try:
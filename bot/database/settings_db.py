@@ -6,8 +6,11 @@ import logging
 from datetime import datetime
 from typing import Optional, Dict, Any
 
+from cachetools import TTLCache
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
+from config import Config
+
 logger = logging.getLogger(__name__)
 
 
@@ -25,10 +28,23 @@ class SettingsDB:
         "notifications_enabled": True
     }
     
+    # Marks a cached global setting that does not exist
+    _MISSING = object()
+    
     def __init__(self, db: AsyncIOMotorDatabase):
         """Initialize settings database manager."""
         self.collection = db.settings
         self.global_collection = db.global_settings
+        
+        # Write-through caches; every write below goes through this class
+        self._cache: TTLCache = TTLCache(
+            maxsize=Config.SETTINGS_CACHE_SIZE,
+            ttl=Config.SETTINGS_CACHE_TTL
+        )
+        self._global_cache: TTLCache = TTLCache(
+            maxsize=256,
+            ttl=Config.SETTINGS_CACHE_TTL
+        )
     
     async def get_settings(self, user_id: int) -> Dict[str, Any]:
         """
@@ -40,16 +56,20 @@ class SettingsDB:
         Returns:
             User settings dictionary
         """
+        cached = self._cache.get(user_id)
+        if cached is not None:
+            return cached.copy()
+        
         try:
             settings = await self.collection.find_one({"user_id": user_id})
             
+            # Merge with defaults
+            result = self.DEFAULT_SETTINGS.copy()
             if settings:
-                # Merge with defaults
-                result = self.DEFAULT_SETTINGS.copy()
                 result.update({k: v for k, v in settings.items() if k != "_id"})
-                return result
             
-            return self.DEFAULT_SETTINGS.copy()
+            self._cache[user_id] = result
+            return result.copy()
             
         except Exception as e:
             logger.error(f"Error getting settings for {user_id}: {e}")
@@ -81,9 +101,16 @@ class SettingsDB:
                 },
                 upsert=True
             )
+            
+            cached = self._cache.get(user_id)
+            if cached is not None:
+                cached[key] = value
+            
             return True
             
         except Exception as e:
+            # The stored value is now unknown; re-read on next access
+            self._cache.pop(user_id, None)
             logger.error(f"Error updating setting {key} for {user_id}: {e}")
             return False
     
@@ -109,6 +136,7 @@ class SettingsDB:
         """Reset all settings to defaults."""
         try:
             await self.collection.delete_one({"user_id": user_id})
+            self._cache[user_id] = self.DEFAULT_SETTINGS.copy()
             logger.info(f"Settings reset for user {user_id}")
             return True
         except Exception as e:
@@ -119,9 +147,15 @@ class SettingsDB:
     
     async def get_global_setting(self, key: str) -> Optional[Any]:
         """Get a global setting."""
+        cached = self._global_cache.get(key)
+        if cached is not None:
+            return None if cached is self._MISSING else cached
+        
         try:
             setting = await self.global_collection.find_one({"key": key})
-            return setting.get("value") if setting else None
+            value = setting.get("value") if setting else None
+            self._global_cache[key] = self._MISSING if value is None else value
+            return value
         except Exception as e:
             logger.error(f"Error getting global setting {key}: {e}")
             return None
@@ -137,8 +171,10 @@ class SettingsDB:
                 },
                 upsert=True
             )
+            self._global_cache[key] = self._MISSING if value is None else value
             return True
         except Exception as e:
+            self._global_cache.pop(key, None)
             logger.error(f"Error setting global setting {key}: {e}")
             return False
     
@@ -0,0 +1,105 @@
+"""
+Batch task persistence with buffered checkpoints.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class TasksDB:
+    """
+    Batch task database operations manager.
+
+    Checkpoints are buffered in memory, newest snapshot per task wins,
+    and written with a single bulk_write every few seconds.
+    """
+
+    RESUMABLE_STATUSES = ["pending", "running"]
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        """Initialize tasks database manager."""
+        self.collection = db.tasks
+        self._pending: Dict[str, Dict[str, Any]] = {}  # task_id -> snapshot
+        self._flush_lock = asyncio.Lock()
+
+    def checkpoint(self, task_doc: Dict[str, Any]):
+        """
+        Buffer a task snapshot for the next flush.
+
+        Args:
+            task_doc: Task fields to persist, must include task_id
+        """
+        snapshot = dict(task_doc)
+        snapshot["updated_at"] = datetime.utcnow()
+        self._pending[snapshot["task_id"]] = snapshot
+
+    async def flush(self) -> int:
+        """
+        Write all buffered snapshots.
+
+        Returns:
+            Number of tasks written
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            batch, self._pending = self._pending, {}
+
+            operations = [
+                UpdateOne({"task_id": task_id}, {"$set": doc}, upsert=True)
+                for task_id, doc in batch.items()
+            ]
+
+            try:
+                await self.collection.bulk_write(operations, ordered=False)
+                return len(operations)
+            except Exception as e:
+                logger.error(f"Error flushing {len(operations)} task checkpoints: {e}")
+
+                # Keep snapshots that were not superseded for the next attempt
+                for task_id, doc in batch.items():
+                    self._pending.setdefault(task_id, doc)
+                return 0
+
+    async def run_flusher(self, interval: float = None):
+        """Flush buffered checkpoints periodically."""
+        interval = interval or Config.TASK_CHECKPOINT_INTERVAL
+
+        while True:
+            try:
+                await asyncio.sleep(interval)
+                await self.flush()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Task checkpoint flusher error: {e}")
+
+    async def get_resumable_tasks(self) -> List[Dict[str, Any]]:
+        """Get tasks that were pending or running when the bot stopped."""
+        try:
+            cursor = self.collection.find(
+                {"status": {"$in": self.RESUMABLE_STATUSES}},
+                {"_id": 0}
+            ).sort("created_at", 1)
+            return await cursor.to_list(length=None)
+        except Exception as e:
+            logger.error(f"Error getting resumable tasks: {e}")
+            return []
+
+    async def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Get a task by ID."""
+        try:
+            return await self.collection.find_one({"task_id": task_id}, {"_id": 0})
+        except Exception as e:
+            logger.error(f"Error getting task {task_id}: {e}")
+            return None
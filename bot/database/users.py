@@ -2,11 +2,15 @@
 User database operations.
 """
 
+import asyncio
 import logging
-from datetime import datetime
-from typing import Optional, List, Dict, Any
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, AsyncIterator
 
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from config import Config
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +23,11 @@ class UsersDB:
     def __init__(self, db: AsyncIOMotorDatabase):
         """Initialize users database manager."""
         self.collection = db.users
+        
+        # Write-behind buffer of activity updates, one entry per user
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
     
     async def add_user(
         self,
@@ -47,7 +56,8 @@ class UsersDB:
                         "username": username,
                         "first_name": first_name,
                         "last_name": last_name,
-                        "last_active": datetime.utcnow()
+                        "last_active": datetime.utcnow(),
+                        "is_blocked": False
                     },
                     "$setOnInsert": {
                         "user_id": user_id,
@@ -93,7 +103,6 @@ class UsersDB:
     async def get_active_users(self, days: int = 7) -> List[Dict[str, Any]]:
         """Get users active in the last N days."""
         try:
-            from datetime import timedelta
             cutoff = datetime.utcnow() - timedelta(days=days)
             cursor = self.collection.find({"last_active": {"$gte": cutoff}})
             return await cursor.to_list(length=None)
@@ -125,24 +134,221 @@ class UsersDB:
             logger.error(f"Error unbanning user {user_id}: {e}")
             return False
     
+    async def mark_blocked(self, user_id: int) -> bool:
+        """Mark a user who blocked the bot or deleted their account."""
+        try:
+            result = await self.collection.update_one(
+                {"user_id": user_id},
+                {"$set": {"is_blocked": True, "blocked_at": datetime.utcnow()}}
+            )
+            return result.modified_count > 0
+        except Exception as e:
+            logger.error(f"Error marking user {user_id} as blocked: {e}")
+            return False
+    
     async def is_banned(self, user_id: int) -> bool:
         """Check if user is banned."""
         try:
-            user = await self.get_user(user_id)
-            return user.get("is_banned", False) if user else False
+            user = await self.collection.find_one(
+                {"user_id": user_id, "is_banned": True},
+                {"_id": 1}
+            )
+            return user is not None
         except Exception as e:
             logger.error(f"Error checking ban status for {user_id}: {e}")
             return False
     
     async def update_last_active(self, user_id: int):
-        """Update user's last active timestamp."""
+        """Update user's last active timestamp (buffered)."""
+        self._buffer(user_id, {}, upsert=False)
+    
+    async def record_activity(
+        self,
+        user_id: int,
+        username: Optional[str] = None,
+        first_name: Optional[str] = None,
+        last_name: Optional[str] = None
+    ):
+        """
+        Buffered equivalent of add_user.
+        
+        Updates for the same user are coalesced in memory and written
+        with the next flush.
+        
+        Args:
+            user_id: Telegram user ID
+            username: Telegram username
+            first_name: User's first name
+            last_name: User's last name
+        """
+        self._buffer(
+            user_id,
+            {"username": username, "first_name": first_name, "last_name": last_name},
+            upsert=True
+        )
+    
+    def _buffer(self, user_id: int, fields: Dict[str, Any], upsert: bool):
+        """Merge an activity update into the write-behind buffer."""
+        entry = self._pending.setdefault(user_id, {"fields": {}, "upsert": False})
+        entry["fields"].update(fields)
+        entry["fields"]["last_active"] = datetime.utcnow()
+        # A user who talks to the bot has unblocked it
+        entry["fields"]["is_blocked"] = False
+        entry["upsert"] = entry["upsert"] or upsert
+        
+        if len(self._pending) >= Config.ACTIVITY_FLUSH_SIZE and not (
+            self._flush_task and not self._flush_task.done()
+        ):
+            self._flush_task = asyncio.create_task(self.flush())
+    
+    async def flush(self) -> int:
+        """
+        Write all buffered activity updates in one unordered bulk_write.
+        
+        Returns:
+            Number of users written
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            
+            batch, self._pending = self._pending, {}
+            
+            operations = []
+            for user_id, entry in batch.items():
+                update = {"$set": entry["fields"]}
+                if entry["upsert"]:
+                    update["$setOnInsert"] = {
+                        "user_id": user_id,
+                        "joined_at": entry["fields"]["last_active"],
+                        "is_banned": False,
+                        "is_premium": False
+                    }
+                operations.append(
+                    UpdateOne({"user_id": user_id}, update, upsert=entry["upsert"])
+                )
+            
+            try:
+                await self.collection.bulk_write(operations, ordered=False)
+                return len(operations)
+            except Exception as e:
+                logger.error(f"Error flushing {len(operations)} user activity updates: {e}")
+                
+                # Keep entries that were not superseded for the next attempt
+                for user_id, entry in batch.items():
+                    self._pending.setdefault(user_id, entry)
+                return 0
+    
+    async def run_flusher(self, interval: float = None):
+        """Flush buffered activity updates periodically."""
+        interval = interval or Config.ACTIVITY_FLUSH_INTERVAL
+        
+        while True:
+            try:
+                await asyncio.sleep(interval)
+                await self.flush()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"User activity flusher error: {e}")
+    
+    async def iter_users(
+        self,
+        query: Optional[Dict[str, Any]] = None,
+        projection: Optional[Dict[str, Any]] = None,
+        batch_size: int = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream users without loading the collection into memory.
+        
+        Args:
+            query: MongoDB filter
+            projection: Fields to return
+            batch_size: Documents per cursor batch
+            
+        Yields:
+            User documents
+        """
+        cursor = self.collection.find(
+            query or {},
+            projection,
+            batch_size=batch_size or Config.USER_CURSOR_BATCH_SIZE
+        )
+        async for user in cursor:
+            yield user
+    
+    async def iter_active_users(
+        self,
+        days: int = 7,
+        projection: Optional[Dict[str, Any]] = None,
+        batch_size: int = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream users active in the last N days."""
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        async for user in self.iter_users(
+            {"last_active": {"$gte": cutoff}},
+            projection,
+            batch_size
+        ):
+            yield user
+    
+    async def iter_user_ids(
+        self,
+        query: Optional[Dict[str, Any]] = None,
+        batch_size: int = None,
+        after_user_id: Optional[int] = None
+    ) -> AsyncIterator[int]:
+        """
+        Stream user IDs in ascending order.
+        
+        Args:
+            query: MongoDB filter
+            batch_size: Documents per cursor batch
+            after_user_id: Only yield IDs greater than this one (for resuming)
+            
+        Yields:
+            User IDs
+        """
+        query = dict(query or {})
+        if after_user_id is not None:
+            query["user_id"] = {"$gt": after_user_id}
+        
+        cursor = self.collection.find(
+            query,
+            {"user_id": 1, "_id": 0},
+            batch_size=batch_size or Config.USER_CURSOR_BATCH_SIZE
+        ).sort("user_id", 1)
+        
+        async for user in cursor:
+            yield user["user_id"]
+    
+    async def get_users_page(
+        self,
+        after_user_id: Optional[int] = None,
+        limit: int = 50,
+        projection: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get one page of users ordered by user_id (keyset pagination).
+        
+        Args:
+            after_user_id: user_id of the last user on the previous page
+            limit: Page size
+            projection: Fields to return
+            
+        Returns:
+            Users on the page; pass the last user_id to get the next one
+        """
         try:
-            await self.collection.update_one(
-                {"user_id": user_id},
-                {"$set": {"last_active": datetime.utcnow()}}
-            )
+            query = {}
+            if after_user_id is not None:
+                query["user_id"] = {"$gt": after_user_id}
+            
+            cursor = self.collection.find(query, projection).sort("user_id", 1).limit(limit)
+            return await cursor.to_list(length=limit)
         except Exception as e:
-            logger.error(f"Error updating last active for {user_id}: {e}")
+            logger.error(f"Error getting users page after {after_user_id}: {e}")
+            return []
     
     async def get_user_ids(self) -> List[int]:
         """Get all user IDs for broadcasting."""
@@ -3,14 +3,19 @@ Helper modules for Serena Forward Bot.
 """
 
 from .progress import ProgressBar
-from .thumbnail import ThumbnailGenerator
+from .thumbnail import ThumbnailGenerator, ThumbnailResolver
 from .cleanup import CleanupManager
 from .decorators import (
     check_subscription,
     check_login,
     owner_only,
     rate_limit,
-    bot_enabled
+    bot_enabled,
+    require,
+    build_context,
+    UserContext,
+    cache_subscription,
+    invalidate_subscription
 )
 from .utils import (
     get_readable_size,
@@ -19,17 +24,39 @@ from .utils import (
     sanitize_filename
 )
 from .queue_manager import QueueManager
+from .forwarder import BatchForwarder
+from .transfer import MediaTransfer
+from .streaming import MediaStreamer
+from .pipeline import TransferPipeline
+from .disk_budget import DiskBudget
+from .flood_control import FloodScheduler
+from .client_pool import UserClientPool
+from .broadcaster import Broadcaster
 
 __all__ = [
     "ProgressBar",
     "ThumbnailGenerator",
+    "ThumbnailResolver",
     "CleanupManager",
     "QueueManager",
+    "BatchForwarder",
+    "MediaTransfer",
+    "MediaStreamer",
+    "TransferPipeline",
+    "DiskBudget",
+    "FloodScheduler",
+    "UserClientPool",
+    "Broadcaster",
     "check_subscription",
     "check_login",
     "owner_only",
     "rate_limit",
     "bot_enabled",
+    "require",
+    "build_context",
+    "UserContext",
+    "cache_subscription",
+    "invalidate_subscription",
     "get_readable_size",
     "get_readable_time",
     "parse_chat_id",
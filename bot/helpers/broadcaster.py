@@ -0,0 +1,190 @@
+"""
+Paced, resumable broadcast engine.
+"""
+
+import time
+import asyncio
+import logging
+from typing import List, Optional
+
+from pyrogram import Client
+from pyrogram.types import Message
+from pyrogram.errors import (
+    UserIsBlocked,
+    InputUserDeactivated,
+    UserIsBot
+)
+
+from config import Config
+from .flood_control import FloodScheduler
+from .utils import get_readable_time
+
+logger = logging.getLogger(__name__)
+
+# Errors meaning the user can never receive messages from the bot again.
+# PeerIdInvalid is not one of them: it usually means the peer is missing
+# from the session cache, so it only counts as a failure.
+UNREACHABLE_ERRORS = (UserIsBlocked, InputUserDeactivated, UserIsBot)
+
+
+class Broadcaster:
+    """
+    Copy one message to every reachable user.
+
+    User IDs are streamed in ascending order and sent in windows with
+    bounded concurrency, paced to BROADCAST_RATE messages per second.
+    Progress is checkpointed after each window as the highest fully
+    processed user ID, so a restarted broadcast continues where it left off.
+    """
+
+    def __init__(
+        self,
+        client: Client,
+        broadcast: dict,
+        status_message: Optional[Message] = None
+    ):
+        """
+        Initialize broadcaster.
+
+        Args:
+            client: Bot client (with .db attached)
+            broadcast: Broadcast document from BroadcastsDB
+            status_message: Message to update with live progress
+        """
+        self.client = client
+        self.db = client.db
+        self.status_message = status_message
+
+        self.broadcast_id: str = broadcast["broadcast_id"]
+        self.from_chat_id: int = broadcast["from_chat_id"]
+        self.message_id: int = broadcast["message_id"]
+        self.last_user_id: Optional[int] = broadcast.get("last_user_id")
+
+        self.sent: int = broadcast.get("sent", 0)
+        self.failed: int = broadcast.get("failed", 0)
+        self.blocked: int = broadcast.get("blocked", 0)
+        self.cancelled = False
+
+        # BROADCAST_RATE is already just under the bot limit, so never exceed it
+        self.scheduler = FloodScheduler(
+            session_rate=Config.BROADCAST_RATE,
+            burst=Config.BROADCAST_RATE,
+            growth=1.0
+        )
+        self.semaphore = asyncio.Semaphore(max(1, Config.BROADCAST_CONCURRENCY))
+
+        self.start_time = time.time()
+        self.start_count = self.processed
+        self.last_update = 0.0
+
+    @property
+    def processed(self) -> int:
+        """Users handled so far, whatever the outcome."""
+        return self.sent + self.failed + self.blocked
+
+    def cancel(self):
+        """Stop after the current window."""
+        self.cancelled = True
+
+    async def run(self):
+        """Run the broadcast to completion or cancellation."""
+        window: List[int] = []
+
+        try:
+            async for user_id in self.db.users.iter_user_ids(
+                query={"is_blocked": {"$ne": True}},
+                after_user_id=self.last_user_id
+            ):
+                window.append(user_id)
+
+                if len(window) >= Config.BROADCAST_WINDOW:
+                    await self._send_window(window)
+                    window = []
+
+                    if self.cancelled:
+                        break
+
+            if window and not self.cancelled:
+                await self._send_window(window)
+
+            status = "cancelled" if self.cancelled else "completed"
+
+        except Exception as e:
+            logger.error(f"Broadcast {self.broadcast_id} error: {e}")
+            status = "failed"
+
+        await self._checkpoint(status=status)
+        await self._report(final=True, status=status)
+
+    async def _send_window(self, user_ids: List[int]):
+        """Send to a window of users concurrently, then checkpoint."""
+        await asyncio.gather(*(self._send(user_id) for user_id in user_ids))
+
+        self.last_user_id = user_ids[-1]
+        await self._checkpoint()
+        await self._report()
+
+    async def _send(self, user_id: int):
+        """Send the broadcast message to one user."""
+        async with self.semaphore:
+            try:
+                await self.scheduler.call(
+                    lambda: self.client.copy_message(
+                        user_id,
+                        self.from_chat_id,
+                        self.message_id
+                    ),
+                    session="bot"
+                )
+                self.sent += 1
+            except UNREACHABLE_ERRORS:
+                self.blocked += 1
+                await self.db.users.mark_blocked(user_id)
+            except Exception as e:
+                logger.debug(f"Broadcast to {user_id} failed: {e}")
+                self.failed += 1
+
+    async def _checkpoint(self, **fields):
+        """Persist progress."""
+        await self.db.broadcasts.checkpoint(
+            self.broadcast_id,
+            last_user_id=self.last_user_id,
+            sent=self.sent,
+            failed=self.failed,
+            blocked=self.blocked,
+            **fields
+        )
+
+    async def _report(self, final: bool = False, status: str = "running"):
+        """Edit the status message with live throughput."""
+        if not self.status_message:
+            return
+
+        now = time.time()
+        if not final and now - self.last_update < Config.PROGRESS_UPDATE_DELAY:
+            return
+        self.last_update = now
+
+        elapsed = now - self.start_time
+        rate = (self.processed - self.start_count) / elapsed if elapsed > 0 else 0
+
+        titles = {
+            "running": "📢 **Broadcasting...**",
+            "completed": "✅ **Broadcast Completed**",
+            "cancelled": "❌ **Broadcast Cancelled**",
+            "failed": "⚠️ **Broadcast Failed**",
+        }
+
+        text = (
+            f"{titles.get(status, titles['running'])}\n\n"
+            f"✅ Sent: {self.sent}\n"
+            f"🚫 Blocked: {self.blocked}\n"
+            f"❌ Failed: {self.failed}\n"
+            f"🚀 Speed: {rate:.1f} msg/s\n"
+            f"⏱ Elapsed: {get_readable_time(int(elapsed))}"
+        )
+
+        try:
+            await self.status_message.edit_text(text)
+        except Exception as e:
+            logger.debug(f"Broadcast progress update error: {e}")
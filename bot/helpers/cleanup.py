@@ -183,6 +183,10 @@ class CleanupManager:
                 # Clean old files
                 await CleanupManager.cleanup_directory(Config.DOWNLOAD_PATH, 24)
                 await CleanupManager.cleanup_directory(Config.THUMB_PATH, 24)
+                await CleanupManager.cleanup_directory(
+                    Config.THUMB_CACHE_PATH,
+                    Config.THUMB_CACHE_MAX_AGE_HOURS
+                )
                 
                 logger.info("Scheduled cleanup completed")
                 
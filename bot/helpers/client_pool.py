@@ -0,0 +1,263 @@
+"""
+Lazily connected pool of user clients.
+"""
+
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from pyrogram import Client
+from pyrogram.errors import (
+    AuthKeyUnregistered, AuthKeyInvalid, AuthKeyDuplicated,
+    SessionRevoked, SessionExpired, UserDeactivated, UserDeactivatedBan
+)
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Errors meaning the stored session can never be used again
+INVALID_SESSION_ERRORS = (
+    AuthKeyUnregistered,
+    AuthKeyInvalid,
+    AuthKeyDuplicated,
+    SessionRevoked,
+    SessionExpired,
+    UserDeactivated,
+    UserDeactivatedBan,
+)
+
+
+class UserClientPool:
+    """
+    Pool of user clients connected on demand.
+
+    A user's client is started the first time a command needs it, kept
+    warm for CLIENT_IDLE_TIMEOUT seconds after last use, and disconnected
+    in least-recently-used order once more than MAX_ACTIVE_CLIENTS are
+    connected. Clients of users with a running batch are never evicted.
+    """
+
+    def __init__(
+        self,
+        is_busy: Optional[Callable[[int], bool]] = None,
+        max_clients: int = None,
+        idle_timeout: float = None
+    ):
+        """
+        Initialize client pool.
+
+        Args:
+            is_busy: Returns True if a user's client must stay connected
+            max_clients: Connected clients allowed before LRU eviction
+            idle_timeout: Seconds of inactivity before a client is stopped
+        """
+        self.is_busy = is_busy or (lambda user_id: False)
+        self.max_clients = max_clients or Config.MAX_ACTIVE_CLIENTS
+        self.idle_timeout = idle_timeout or Config.CLIENT_IDLE_TIMEOUT
+
+        # Session store (SessionsDB), attached once the database is connected
+        self.sessions = None
+
+        self.clients: "OrderedDict[int, Client]" = OrderedDict()  # LRU order
+        self.last_used: Dict[int, float] = {}
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self._closing: Set[asyncio.Task] = set()
+
+    def __contains__(self, user_id: int) -> bool:
+        """Check if a user's client is currently connected."""
+        return user_id in self.clients
+
+    def __len__(self) -> int:
+        return len(self.clients)
+
+    def _touch(self, user_id: int):
+        """Mark a client as just used."""
+        self.clients.move_to_end(user_id)
+        self.last_used[user_id] = time.monotonic()
+
+    def get(self, user_id: int) -> Optional[Client]:
+        """Get a user's client only if it is already connected."""
+        client = self.clients.get(user_id)
+        if client:
+            self._touch(user_id)
+        return client
+
+    async def acquire(self, user_id: int) -> Optional[Client]:
+        """
+        Get a user's client, connecting it from the stored session if needed.
+
+        Args:
+            user_id: Telegram user ID
+
+        Returns:
+            Connected client, or None if the user has no usable session
+        """
+        client = self.get(user_id)
+        if client:
+            return client
+
+        lock = self._locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            # Another caller may have connected it while we waited
+            client = self.get(user_id)
+            if client:
+                return client
+
+            if not self.sessions:
+                return None
+
+            session_string = await self.sessions.get_session(user_id)
+            if not session_string:
+                return None
+
+            client = await self._start(user_id, session_string)
+            if client:
+                self.add(user_id, client)
+
+        return client
+
+    async def warm(self, user_ids: Iterable[int]):
+        """
+        Connect several users' clients concurrently.
+
+        At most SESSION_RESTORE_CONCURRENCY clients start at once.
+        """
+        semaphore = asyncio.Semaphore(max(1, Config.SESSION_RESTORE_CONCURRENCY))
+
+        async def warm_one(user_id: int):
+            async with semaphore:
+                await self.acquire(user_id)
+
+        await asyncio.gather(*(warm_one(user_id) for user_id in set(user_ids)))
+
+    async def _start(self, user_id: int, session_string: str) -> Optional[Client]:
+        """Start a user client from a session string."""
+        client = Client(
+            name=f"user_{user_id}",
+            api_id=Config.API_ID,
+            api_hash=Config.API_HASH,
+            session_string=session_string,
+            in_memory=True
+        )
+
+        try:
+            await asyncio.wait_for(client.start(), timeout=Config.SESSION_START_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"Timed out starting session for user {user_id}")
+            await self._close(user_id, client)
+            return None
+        except INVALID_SESSION_ERRORS as e:
+            logger.error(f"Session of user {user_id} is no longer valid: {e}")
+            await self._close(user_id, client)
+            await self.sessions.invalidate_session(user_id)
+            return None
+        except Exception as e:
+            # Network and server errors are not a broken session; keep it for the next attempt
+            logger.error(f"Failed to load session for user {user_id}: {e}")
+            await self._close(user_id, client)
+            return None
+
+        logger.info(f"Loaded session for user {user_id}")
+        return client
+
+    def add(self, user_id: int, client: Client):
+        """Register an already connected client (e.g. right after login)."""
+        self.clients[user_id] = client
+        self._touch(user_id)
+
+        # Victims are picked now, so the client being handed out is never one of them
+        victims = self._over_capacity(keep=user_id)
+        if victims:
+            task = asyncio.create_task(self._close_all(victims))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    async def remove(self, user_id: int):
+        """Disconnect and forget a user's client."""
+        client = self._detach(user_id)
+
+        if client:
+            await self._close(user_id, client)
+
+    def _detach(self, user_id: int) -> Optional[Client]:
+        """Forget a user's client without stopping it."""
+        client = self.clients.pop(user_id, None)
+        self.last_used.pop(user_id, None)
+
+        # Keep the lock only while someone is connecting this user
+        lock = self._locks.get(user_id)
+        if lock and not lock.locked():
+            del self._locks[user_id]
+
+        return client
+
+    @staticmethod
+    async def _close(user_id: int, client: Client):
+        """Stop a started client or disconnect a merely connected one."""
+        try:
+            if client.is_initialized:
+                await client.stop()
+            elif client.is_connected:
+                await client.disconnect()
+            logger.info(f"Closed client for user {user_id}")
+        except Exception as e:
+            logger.error(f"Error closing client for user {user_id}: {e}")
+
+    def _over_capacity(self, keep: int) -> List[Tuple[int, Client]]:
+        """Detach least recently used idle clients beyond the cap."""
+        victims = []
+        for user_id in list(self.clients):
+            if len(self.clients) <= self.max_clients:
+                break
+            if user_id != keep and not self.is_busy(user_id):
+                victims.append((user_id, self._detach(user_id)))
+        return victims
+
+    async def _close_all(self, victims: List[Tuple[int, Client]]):
+        """Stop detached clients."""
+        for user_id, client in victims:
+            await self._close(user_id, client)
+
+    async def evict_idle(self) -> int:
+        """
+        Stop clients unused for longer than the idle timeout.
+
+        Returns:
+            Number of clients stopped
+        """
+        cutoff = time.monotonic() - self.idle_timeout
+
+        # Detach all victims before the first await, so none can be handed out while stopping
+        idle = [
+            (user_id, self._detach(user_id))
+            for user_id in list(self.clients)
+            if self.last_used.get(user_id, 0) < cutoff and not self.is_busy(user_id)
+        ]
+
+        await self._close_all(idle)
+
+        if idle:
+            logger.info(f"Evicted {len(idle)} idle user clients")
+        return len(idle)
+
+    async def run_evictor(self, interval: float = 60):
+        """Evict idle clients periodically."""
+        while True:
+            try:
+                await asyncio.sleep(interval)
+                await self.evict_idle()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Client evictor error: {e}")
+
+    async def stop_all(self):
+        """Disconnect every client."""
+        for user_id in list(self.clients):
+            await self.remove(user_id)
+
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
@@ -2,24 +2,128 @@
 Decorator functions for command handlers.
 """
 
-import time
+import math
+import asyncio
 import logging
+from dataclasses import dataclass
 from functools import wraps
-from typing import Callable, List, Optional
+from typing import Callable, List, Optional, Tuple
 
+from cachetools import TTLCache
 from pyrogram import Client
 from pyrogram.types import Message, CallbackQuery
 from pyrogram.errors import UserNotParticipant, ChatAdminRequired
 
 from config import Config
 from strings.messages import Messages
+from .flood_control import RateLimiter
 
 logger = logging.getLogger(__name__)
 
+# Force-sub membership results; members are re-checked rarely, non-members soon
+_subscribed_cache: TTLCache = TTLCache(
+    maxsize=Config.SUB_CACHE_SIZE,
+    ttl=Config.SUB_CACHE_TTL
+)
+_unsubscribed_cache: TTLCache = TTLCache(
+    maxsize=Config.SUB_CACHE_SIZE,
+    ttl=Config.SUB_NEGATIVE_CACHE_TTL
+)
+
+
+def cache_subscription(user_id: int, subscribed: bool):
+    """Remember a user's force-sub membership."""
+    invalidate_subscription(user_id)
+    
+    if subscribed:
+        _subscribed_cache[user_id] = True
+    else:
+        _unsubscribed_cache[user_id] = True
+
+
+def invalidate_subscription(user_id: int):
+    """Forget a user's cached force-sub membership."""
+    _subscribed_cache.pop(user_id, None)
+    _unsubscribed_cache.pop(user_id, None)
+
+
+async def is_subscribed(client: Client, user_id: int) -> bool:
+    """
+    Check force-sub membership, using the cache when possible.
+    
+    Fails open (returns True) if membership cannot be checked.
+    """
+    if user_id in _subscribed_cache:
+        return True
+    if user_id in _unsubscribed_cache:
+        return False
+    
+    try:
+        member = await client.get_chat_member(
+            f"@{Config.FORCE_SUB_CHANNEL}",
+            user_id
+        )
+        subscribed = member.status not in ["left", "kicked"]
+        
+    except UserNotParticipant:
+        subscribed = False
+    except ChatAdminRequired:
+        logger.warning("Bot is not admin in force sub channel")
+        return True
+    except Exception as e:
+        logger.error(f"Subscription check error: {e}")
+        return True
+    
+    cache_subscription(user_id, subscribed)
+    return subscribed
+
+
+async def _reply_force_sub(update: Message | CallbackQuery):
+    """Ask a non-subscribed user to join the force sub channel."""
+    from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+    
+    keyboard = InlineKeyboardMarkup([
+        [InlineKeyboardButton(
+            "📢 Join Channel",
+            url=Config.FORCE_SUB_LINK
+        )],
+        [InlineKeyboardButton(
+            "🔄 Check Again",
+            callback_data="check_subscription"
+        )]
+    ])
+    
+    if isinstance(update, Message):
+        await update.reply_text(
+            Messages.FORCE_SUB,
+            reply_markup=keyboard
+        )
+    else:
+        await update.answer(
+            "Please join our channel first!",
+            show_alert=True
+        )
+
+
+async def _has_session(client: Client, user_id: int) -> bool:
+    """Check if a user has a connected client or a stored active session."""
+    if user_id in client.user_clients:
+        return True
+    return await client.db.sessions.has_active_session(user_id)
+
+
+async def _reply(update: Message | CallbackQuery, text: str):
+    """Answer an update with a short notice."""
+    if isinstance(update, Message):
+        await update.reply_text(text, quote=True)
+    else:
+        await update.answer(text, show_alert=True)
+
 
 def check_subscription(func: Callable) -> Callable:
     """
     Decorator to check if user is subscribed to force sub channel.
+    Membership is cached per user (see cache_subscription).
     """
     @wraps(func)
     async def wrapper(client: Client, update: Message | CallbackQuery, *args, **kwargs):
@@ -32,45 +136,9 @@ def check_subscription(func: Callable) -> Callable:
         if Config.is_owner(user_id):
             return await func(client, update, *args, **kwargs)
         
-        try:
-            member = await client.get_chat_member(
-                f"@{Config.FORCE_SUB_CHANNEL}",
-                user_id
-            )
-            
-            if member.status in ["left", "kicked"]:
-                raise UserNotParticipant(f"User {user_id} not subscribed")
-                
-        except UserNotParticipant:
-            from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-            
-            keyboard = InlineKeyboardMarkup([
-                [InlineKeyboardButton(
-                    "📢 Join Channel",
-                    url=Config.FORCE_SUB_LINK
-                )],
-                [InlineKeyboardButton(
-                    "🔄 Check Again",
-                    callback_data="check_subscription"
-                )]
-            ])
-            
-            if isinstance(update, Message):
-                await update.reply_text(
-                    Messages.FORCE_SUB,
-                    reply_markup=keyboard
-                )
-            else:
-                await update.answer(
-                    "Please join our channel first!",
-                    show_alert=True
-                )
+        if not await is_subscribed(client, user_id):
+            await _reply_force_sub(update)
             return
-            
-        except ChatAdminRequired:
-            logger.warning("Bot is not admin in force sub channel")
-        except Exception as e:
-            logger.error(f"Subscription check error: {e}")
         
         return await func(client, update, *args, **kwargs)
     
@@ -85,17 +153,12 @@ def check_login(func: Callable) -> Callable:
     async def wrapper(client: Client, message: Message, *args, **kwargs):
         user_id = message.from_user.id
         
-        # Check if user has an active client
-        if user_id not in client.user_clients:
-            # Try to load from database
-            has_session = await client.db.sessions.has_active_session(user_id)
-            
-            if not has_session:
-                await message.reply_text(
-                    Messages.NOT_LOGGED_IN,
-                    quote=True
-                )
-                return
+        if not await _has_session(client, user_id):
+            await message.reply_text(
+                Messages.NOT_LOGGED_IN,
+                quote=True
+            )
+            return
         
         return await func(client, message, *args, **kwargs)
     
@@ -143,6 +206,9 @@ def rate_limit(
     _window = window_seconds or Config.RATE_LIMIT_WINDOW
     
     def decorator(func: Callable) -> Callable:
+        # One limiter per decorated handler, so limits never share state
+        limiter = RateLimiter(_max_calls, _window)
+        
         @wraps(func)
         async def wrapper(client: Client, message: Message, *args, **kwargs):
             user_id = message.from_user.id
@@ -151,29 +217,14 @@ def rate_limit(
             if Config.is_owner(user_id):
                 return await func(client, message, *args, **kwargs)
             
-            now = time.time()
-            
-            # Initialize or clean old entries
-            if user_id not in client.rate_limit_cache:
-                client.rate_limit_cache[user_id] = []
-            
-            # Remove old entries
-            client.rate_limit_cache[user_id] = [
-                t for t in client.rate_limit_cache[user_id]
-                if now - t < _window
-            ]
-            
-            # Check limit
-            if len(client.rate_limit_cache[user_id]) >= _max_calls:
+            wait = limiter.hit(user_id)
+            if wait:
                 await message.reply_text(
-                    f"⚠️ Rate limit exceeded. Please wait {_window} seconds.",
+                    f"⚠️ Rate limit exceeded. Please wait {math.ceil(wait)} seconds.",
                     quote=True
                 )
                 return
             
-            # Record this call
-            client.rate_limit_cache[user_id].append(now)
-            
             return await func(client, message, *args, **kwargs)
         
         return wrapper
@@ -197,3 +248,117 @@ def bot_enabled(func: Callable) -> Callable:
         return await func(client, message, *args, **kwargs)
     
     return wrapper
+
+
+@dataclass
+class UserContext:
+    """Everything the access checks need to know about the sender of an update."""
+    user_id: int
+    is_owner: bool
+    is_banned: bool = False
+    is_subscribed: bool = True
+    has_session: bool = False
+
+
+async def build_context(
+    client: Client,
+    user_id: int,
+    subscription: bool = True,
+    login: bool = False
+) -> UserContext:
+    """
+    Resolve a user's context with all lookups running concurrently.
+    
+    Owners skip the lookups entirely.
+    
+    Args:
+        client: Bot client
+        user_id: Telegram user ID
+        subscription: Whether to resolve force-sub membership
+        login: Whether to resolve session presence
+        
+    Returns:
+        Populated UserContext
+    """
+    ctx = UserContext(user_id=user_id, is_owner=Config.is_owner(user_id))
+    if ctx.is_owner:
+        ctx.has_session = login and await _has_session(client, user_id)
+        return ctx
+    
+    async def skip(default: bool) -> bool:
+        return default
+    
+    ctx.is_banned, ctx.is_subscribed, ctx.has_session = await asyncio.gather(
+        client.db.users.is_banned(user_id),
+        is_subscribed(client, user_id) if subscription else skip(True),
+        _has_session(client, user_id) if login else skip(False)
+    )
+    return ctx
+
+
+def require(
+    enabled: bool = True,
+    subscription: bool = True,
+    login: bool = False,
+    owner: bool = False,
+    rate: Optional[Tuple[int, int]] = None
+) -> Callable:
+    """
+    Fused access check for handlers, replacing stacked decorators.
+    
+    The sender's context is built once per update with concurrent lookups,
+    then checked in order: owner, bot enabled, ban, subscription, login,
+    rate limit. The rate limit comes last so rejected updates spend no
+    tokens. Owners bypass all but the login requirement.
+    
+    Args:
+        enabled: Refuse while the bot is disabled
+        subscription: Require force-sub channel membership
+        login: Require an active session
+        owner: Restrict to owners
+        rate: (max_calls, window_seconds) rate limit for this handler
+    """
+    def decorator(func: Callable) -> Callable:
+        limiter = RateLimiter(*rate) if rate else None
+        
+        @wraps(func)
+        async def wrapper(client: Client, update: Message | CallbackQuery, *args, **kwargs):
+            user_id = update.from_user.id if update.from_user else None
+            if not user_id:
+                return
+            
+            ctx = await build_context(client, user_id, subscription, login)
+            
+            if owner and not ctx.is_owner:
+                await _reply(update, "⛔ This command is restricted to bot owners only.")
+                return
+            
+            if enabled and not ctx.is_owner and not client.is_enabled:
+                await _reply(update, "🔴 Bot is currently disabled. Please try again later.")
+                return
+            
+            if ctx.is_banned:
+                await _reply(update, "🚫 You are banned from using this bot.")
+                return
+            
+            if subscription and not ctx.is_subscribed:
+                await _reply_force_sub(update)
+                return
+            
+            if login and not ctx.has_session:
+                await _reply(update, Messages.NOT_LOGGED_IN)
+                return
+            
+            wait = limiter.hit(user_id) if limiter and not ctx.is_owner else 0
+            if wait:
+                await _reply(
+                    update,
+                    f"⚠️ Rate limit exceeded. Please wait {math.ceil(wait)} seconds."
+                )
+                return
+            
+            return await func(client, update, *args, **kwargs)
+        
+        return wrapper
+    
+    return decorator
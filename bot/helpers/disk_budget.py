@@ -0,0 +1,101 @@
+"""
+Byte budget for files downloaded to local disk.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Deque
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class DiskBudget:
+    """
+    Reservations against a fixed download quota.
+
+    A download reserves its file size before it starts and releases it
+    once its files are deleted, so concurrent batches can never together
+    download more than the quota.
+
+    Reservations are granted first come, first served: while anyone is
+    waiting, later requests queue behind them even if they would fit, so a
+    file that needs the whole quota is not starved by smaller ones.
+    """
+
+    def __init__(self, limit: int):
+        """
+        Initialize disk budget.
+
+        Args:
+            limit: Bytes that may be reserved at once
+        """
+        self.limit = limit
+        self.used = 0
+        self._released = asyncio.Condition()
+        self._waiters: Deque[object] = deque()
+
+    @property
+    def available(self) -> int:
+        """Bytes that can still be reserved."""
+        return self.limit - self.used
+
+    def clamp(self, size: int) -> int:
+        """Cap a request at the quota so oversized files can still run alone."""
+        return max(0, min(size, self.limit))
+
+    def try_reserve(self, size: int) -> bool:
+        """
+        Reserve bytes only if they are available right now and nobody
+        is waiting ahead.
+
+        Returns:
+            True if reserved
+        """
+        size = self.clamp(size)
+        if self._waiters or size > self.available:
+            return False
+
+        self.used += size
+        return True
+
+    async def reserve(self, size: int) -> int:
+        """
+        Reserve bytes, waiting for releases if the budget is exhausted.
+
+        Returns:
+            Bytes actually reserved (to pass to release())
+        """
+        size = self.clamp(size)
+        if self.try_reserve(size):
+            return size
+
+        waiter = object()
+        async with self._released:
+            self._waiters.append(waiter)
+            try:
+                await self._released.wait_for(
+                    lambda: self._waiters[0] is waiter and size <= self.available
+                )
+                self.used += size
+            finally:
+                self._waiters.remove(waiter)
+                # The next waiter may fit in what is left
+                self._released.notify_all()
+
+        return size
+
+    async def release(self, size: int):
+        """Return reserved bytes to the budget."""
+        if size <= 0:
+            return
+
+        async with self._released:
+            self.used = max(0, self.used - size)
+            self._released.notify_all()
+
+
+# Shared by every batch so the quota holds across users
+disk_budget = DiskBudget(Config.DOWNLOAD_QUOTA_MB * 1024 * 1024)
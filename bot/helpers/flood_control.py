@@ -0,0 +1,293 @@
+"""
+Adaptive FloodWait-aware rate scheduling shared by all user clients.
+"""
+
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from cachetools import TTLCache
+from pyrogram.errors import FloodWait
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Token bucket whose rate adapts to FloodWait responses.
+
+    The rate grows slowly on success and is halved on a FloodWait. The rate
+    at which a FloodWait happened is remembered as a ceiling, and later
+    growth stops just below it. The ceiling is forgotten after a quiet
+    period, since Telegram's limits are not fixed.
+    """
+
+    # Fraction of the learned ceiling the bucket is allowed to reach
+    HEADROOM = 0.9
+
+    # Seconds without a FloodWait after which the ceiling is dropped
+    CEILING_TTL = 600
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        min_rate: float = 0.05,
+        max_rate: Optional[float] = None
+    ):
+        """
+        Initialize token bucket.
+
+        Args:
+            rate: Initial refill rate in tokens per second
+            capacity: Maximum burst size
+            min_rate: Lowest rate backoff may reach
+            max_rate: Highest rate growth may reach
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.max_rate = max_rate or rate * 2
+        self.step = rate * 0.05
+        self.ceiling: Optional[float] = None
+        self.last_flood = 0.0
+
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        """Add tokens for the time elapsed since the last refill."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token can be taken."""
+        self._refill(now)
+
+        if now < self.blocked_until:
+            return self.blocked_until - now
+
+        if self.tokens >= 1:
+            return 0.0
+
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        """Consume one token."""
+        self.tokens -= 1
+
+    def reward(self):
+        """Grow the rate additively after a successful call."""
+        if self.ceiling and time.monotonic() - self.last_flood > self.CEILING_TTL:
+            self.ceiling = None
+
+        limit = self.max_rate
+        if self.ceiling:
+            limit = min(limit, self.ceiling * self.HEADROOM)
+
+        self.rate = max(self.min_rate, min(limit, self.rate + self.step))
+
+    def penalize(self, seconds: float, multiplier: float):
+        """Back off after a FloodWait of the given length."""
+        now = time.monotonic()
+
+        self.ceiling = self.rate
+        self.last_flood = now
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = 0
+        self.updated = now
+        self.blocked_until = max(self.blocked_until, now + seconds * multiplier)
+
+
+class RateLimiter:
+    """
+    Per-key sliding-window limiter using GCRA (generic cell rate algorithm).
+
+    Allows max_calls per window with bursts of up to max_calls, storing one
+    float per key. Keys are held in a TTL cache: once a key's window has
+    passed its state equals a fresh key, so entries expire on their own.
+    """
+
+    def __init__(self, max_calls: int, window: float, maxsize: int = None):
+        """
+        Initialize rate limiter.
+
+        Args:
+            max_calls: Calls allowed per window
+            window: Window length in seconds
+            maxsize: Keys tracked before least recently used ones are dropped
+        """
+        self.interval = window / max_calls
+        self.tolerance = window - self.interval
+        self.arrivals: TTLCache = TTLCache(
+            maxsize=maxsize or Config.RATE_LIMIT_CACHE_SIZE,
+            ttl=window
+        )
+
+    def hit(self, key: Hashable) -> float:
+        """
+        Register a call if allowed.
+
+        Args:
+            key: Caller identity (e.g. user ID)
+
+        Returns:
+            0 if the call is allowed, else seconds until it would be
+        """
+        now = time.monotonic()
+        arrival = max(self.arrivals.get(key, now), now)
+
+        wait = arrival - self.tolerance - now
+        if wait > 0:
+            return wait
+
+        self.arrivals[key] = arrival + self.interval
+        return 0.0
+
+
+class FloodScheduler:
+    """
+    Pace Telegram calls across every user client.
+
+    Each call passes through a per-session bucket and, for sends, a
+    per-destination-chat bucket. A FloodWait slows down only the buckets
+    involved, so other sessions and chats keep their throughput.
+
+    Buckets unused for BUCKET_TTL seconds are dropped, so chats and
+    sessions seen once do not accumulate.
+    """
+
+    # Seconds a bucket is kept after its last use
+    BUCKET_TTL = 3600
+
+    def __init__(
+        self,
+        session_rate: float = None,
+        chat_rate: float = None,
+        burst: int = None,
+        multiplier: float = None,
+        max_retries: int = 5,
+        growth: float = 2.0
+    ):
+        """
+        Initialize flood scheduler.
+
+        Args:
+            session_rate: Initial calls per second per user session
+            chat_rate: Initial sends per second per destination chat
+            burst: Bucket capacity
+            multiplier: Factor applied to FloodWait durations
+            max_retries: FloodWaits tolerated for one call before giving up
+            growth: How far above its initial rate a bucket may grow
+        """
+        self.session_rate = session_rate or Config.SESSION_SEND_RATE
+        self.chat_rate = chat_rate or Config.CHAT_SEND_RATE
+        self.burst = burst or Config.SEND_BURST
+        self.multiplier = multiplier or Config.FLOOD_WAIT_MULTIPLIER
+        self.max_retries = max_retries
+        self.growth = growth
+
+        self.buckets: TTLCache = TTLCache(
+            maxsize=Config.RATE_LIMIT_CACHE_SIZE,
+            ttl=self.BUCKET_TTL
+        )
+
+    def _bucket(self, key: Hashable) -> TokenBucket:
+        """Get or create the bucket for a key."""
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            rate = self.session_rate if key[0] == "session" else self.chat_rate
+            bucket = TokenBucket(rate, self.burst, max_rate=rate * self.growth)
+
+        # Re-inserting restarts the entry's TTL, so only idle buckets expire
+        self.buckets[key] = bucket
+        return bucket
+
+    def _keys(self, session: Optional[int], chat: Optional[int]) -> list:
+        """Build bucket keys for a call."""
+        keys = []
+        if session is not None:
+            keys.append(("session", session))
+        if chat is not None:
+            keys.append(("chat", chat))
+        return keys
+
+    async def acquire(self, session: Optional[int] = None, chat: Optional[int] = None):
+        """
+        Wait until every involved bucket has a token, then take them.
+
+        Args:
+            session: User ID owning the client making the call
+            chat: Destination chat ID for sends
+        """
+        buckets = [self._bucket(key) for key in self._keys(session, chat)]
+
+        while True:
+            now = time.monotonic()
+            wait = max((b.delay(now) for b in buckets), default=0.0)
+
+            if wait <= 0:
+                for bucket in buckets:
+                    bucket.take()
+                return
+
+            await asyncio.sleep(wait)
+
+    async def call(
+        self,
+        func: Callable[[], Awaitable[Any]],
+        session: Optional[int] = None,
+        chat: Optional[int] = None
+    ) -> Any:
+        """
+        Run a Telegram call under the scheduler.
+
+        Args:
+            func: Zero-argument callable returning the coroutine to await
+            session: User ID owning the client making the call
+            chat: Destination chat ID for sends
+
+        Returns:
+            Result of the call
+        """
+        keys = self._keys(session, chat)
+        attempt = 0
+
+        while True:
+            await self.acquire(session, chat)
+
+            try:
+                result = await func()
+            except FloodWait as e:
+                attempt += 1
+                for key in keys:
+                    self._bucket(key).penalize(e.value, self.multiplier)
+
+                logger.warning(
+                    f"FloodWait {e.value}s on {keys}, backing off "
+                    f"(attempt {attempt}/{self.max_retries})"
+                )
+
+                if attempt >= self.max_retries:
+                    raise
+                continue
+
+            for key in keys:
+                self._bucket(key).reward()
+
+            return result
+
+    def get_stats(self) -> dict:
+        """Get current rates for monitoring."""
+        now = time.monotonic()
+        return {
+            f"{kind}:{ident}": {
+                "rate": round(bucket.rate, 3),
+                "blocked_for": round(max(0.0, bucket.blocked_until - now), 1)
+            }
+            for (kind, ident), bucket in list(self.buckets.items())
+        }
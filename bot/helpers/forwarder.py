@@ -0,0 +1,524 @@
+"""
+Batch forwarding engine.
+"""
+
+import asyncio
+import logging
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from pyrogram import Client
+from pyrogram.types import Message
+
+from config import Config
+from .flood_control import FloodScheduler
+from .progress import BatchProgressTracker
+from .queue_manager import QueueManager, Task, TaskStatus
+from .transfer import MediaTransfer, get_media
+from .pipeline import TransferPipeline
+from .utils import get_readable_time
+
+logger = logging.getLogger(__name__)
+
+# Telegram refuses get_messages calls with more than 200 ids
+MAX_FETCH_SIZE = 200
+
+# Telegram refuses forward_messages calls with more than 100 ids
+MAX_FORWARD_GROUP = 100
+
+
+class TransferMode(Enum):
+    """How a single source message reaches the destination."""
+    SKIP = "skip"
+    COPY = "copy"
+    FORWARD = "forward"
+    DOWNLOAD = "download"
+
+
+def classify_message(
+    msg: Message,
+    protected: bool,
+    forward_mode: str = "copy"
+) -> TransferMode:
+    """
+    Pick the cheapest way to deliver a message.
+
+    Copies and forwards are server-side and move no bytes through the bot.
+    Only files from content-protected sources have to be downloaded and
+    re-uploaded; their text, contacts, locations and polls still copy fine.
+
+    Args:
+        msg: Source message
+        protected: Whether the source chat has content protection
+        forward_mode: User's forward_mode setting (copy/forward)
+
+    Returns:
+        Transfer mode for the message
+    """
+    if msg.empty or msg.service:
+        return TransferMode.SKIP
+
+    if protected or msg.has_protected_content:
+        if get_media(msg) is not None:
+            return TransferMode.DOWNLOAD
+        return TransferMode.COPY
+
+    if forward_mode == "forward":
+        return TransferMode.FORWARD
+
+    return TransferMode.COPY
+
+
+class SendSequencer:
+    """
+    Let sends through in the order their tickets were issued.
+
+    Send units take a ticket as they are planned, in message id order. They
+    may fetch, download and upload concurrently, but each waits for every
+    earlier ticket to be released before posting to the destination.
+    """
+
+    def __init__(self):
+        """Initialize send sequencer."""
+        self._issued = 0
+        self._next = 0  # lowest ticket not released yet
+        self._released: Set[int] = set()
+        self._turn = asyncio.Condition()
+
+    def ticket(self) -> int:
+        """Issue the next ticket."""
+        ticket = self._issued
+        self._issued += 1
+        return ticket
+
+    async def wait(self, ticket: int):
+        """Wait until every ticket before this one is released."""
+        async with self._turn:
+            await self._turn.wait_for(lambda: ticket <= self._next)
+
+    async def release(self, ticket: int):
+        """Mark a ticket's unit finished, sent or not."""
+        async with self._turn:
+            self._released.add(ticket)
+            while self._next in self._released:
+                self._released.remove(self._next)
+                self._next += 1
+            self._turn.notify_all()
+
+
+class BatchForwarder:
+    """
+    Walk a task's message range and copy it to the destination chat.
+
+    Source messages are fetched in bulk and the next chunk is prefetched
+    while the current one is being sent. Send units run in a bounded
+    in-flight window, so protected files download and upload concurrently,
+    but posts to the destination are made in message id order.
+    """
+
+    def __init__(
+        self,
+        user_client: Client,
+        task: Task,
+        queue_manager: QueueManager,
+        status_message: Optional[Message] = None,
+        settings: Optional[Dict[str, Any]] = None,
+        scheduler: Optional[FloodScheduler] = None,
+        media_cache=None
+    ):
+        """
+        Initialize batch forwarder.
+
+        Args:
+            user_client: Logged-in user client with access to the source
+            task: Task describing the range to forward
+            queue_manager: Queue manager owning the task
+            status_message: Message to update with batch progress
+            settings: User settings (forward_mode, preserve_caption)
+            scheduler: Shared send pacer, a private one is used if omitted
+            media_cache: MediaCacheDB of earlier re-uploads, reused when present
+        """
+        self.user_client = user_client
+        self.task = task
+        self.queue_manager = queue_manager
+        self.status_message = status_message
+        self.scheduler = scheduler or FloodScheduler()
+
+        settings = settings or {}
+        self.forward_mode: str = settings.get("forward_mode", "copy")
+        self.preserve_caption: bool = settings.get("preserve_caption", True)
+        self.protected: bool = False
+        self.media_transfer = MediaTransfer(user_client, task.user_id, cache=media_cache)
+        self.pipeline = TransferPipeline(self.media_transfer)
+
+        self._chunks_left: Optional[List[List[int]]] = None
+        self._next_fetch: Optional[asyncio.Task] = None
+        self._carry: List[Message] = []  # open album held back for the next chunk
+
+        self.fetch_size = max(1, min(Config.BATCH_FETCH_SIZE, MAX_FETCH_SIZE))
+        self.window = asyncio.Semaphore(max(1, Config.BATCH_CONCURRENCY))
+        self.sequencer = SendSequencer()
+        self.tracker: Optional[BatchProgressTracker] = (
+            BatchProgressTracker(status_message, task.total_messages)
+            if status_message else None
+        )
+
+        # A resumed task continues counting from its checkpoint
+        if self.tracker:
+            self.tracker.current = task.current
+            self.tracker.failed = task.failed
+
+    @property
+    def cancelled(self) -> bool:
+        """Check if the task was cancelled."""
+        return self.task.status == TaskStatus.CANCELLED
+
+    @property
+    def owns_task(self) -> bool:
+        """
+        Check if this job's task is still the user's current one.
+
+        After a cancel the user may start a new batch while this job is
+        still finishing its slice; it must not update the new task then.
+        """
+        return self.queue_manager.get_task(self.task.user_id) is self.task
+
+    def _chunks(self) -> List[List[int]]:
+        """Split the task's remaining message range into fetch-sized id chunks."""
+        end = self.task.start_message_id + self.task.total_messages
+        start = self.task.start_message_id
+
+        # Resume after the last checkpointed chunk
+        if self.task.last_message_id is not None:
+            start = self.task.last_message_id + 1
+
+        return [
+            list(range(i, min(i + self.fetch_size, end)))
+            for i in range(start, end, self.fetch_size)
+        ]
+
+    async def run(self):
+        """Run the batch to completion, cancellation or failure."""
+        while not await self.step():
+            pass
+
+    async def step(self) -> bool:
+        """
+        Process the next fetched chunk of the batch.
+
+        The queue manager calls this repeatedly, re-queueing the task
+        between chunks so that long batches share workers fairly.
+
+        Returns:
+            True once the task is finished
+        """
+        try:
+            if self._chunks_left is None:
+                await self._prepare()
+
+            if not self.cancelled and self._chunks_left:
+                await self._process_chunk()
+
+            if self.cancelled or not self._chunks_left:
+                if not self.cancelled:
+                    self.queue_manager.complete_task(self.task.user_id)
+                await self._finish()
+                return True
+
+            return False
+
+        except Exception as e:
+            logger.error(f"Batch engine error for task {self.task.task_id}: {e}")
+            if self.owns_task:
+                self.queue_manager.fail_task(self.task.user_id, str(e))
+            await self._finish()
+            return True
+
+    async def _prepare(self):
+        """Mark the task running and inspect the source chat."""
+        self.queue_manager.start_task(self.task.user_id)
+        self._chunks_left = self._chunks()
+
+        source = await self.user_client.get_chat(self.task.source_chat)
+        self.protected = bool(source.has_protected_content)
+
+        if self._chunks_left:
+            self._next_fetch = asyncio.create_task(self._fetch(self._chunks_left[0]))
+
+    async def _process_chunk(self):
+        """Send one chunk while prefetching the next, keeping the send window full."""
+        in_flight: Set[asyncio.Task] = set()
+
+        messages = self._carry + await self._next_fetch
+        chunk = self._chunks_left.pop(0)
+
+        # An album cut off by the chunk boundary is sent with the next chunk
+        self._carry = self._open_album(messages) if self._chunks_left else []
+        if self._carry:
+            messages = messages[:-len(self._carry)]
+
+        # Prefetch the next chunk while this one is being sent
+        if self._chunks_left:
+            self._next_fetch = asyncio.create_task(self._fetch(self._chunks_left[0]))
+        else:
+            self._next_fetch = None
+
+        try:
+            for unit in self._plan(messages):
+                await self.window.acquire()
+
+                if self.cancelled:
+                    self.window.release()
+                    break
+
+                send = asyncio.create_task(self._send_unit(unit, self.sequencer.ticket()))
+                in_flight.add(send)
+                send.add_done_callback(in_flight.discard)
+                send.add_done_callback(lambda _: self.window.release())
+
+            if in_flight:
+                await asyncio.gather(*in_flight, return_exceptions=True)
+
+        except asyncio.CancelledError:
+            # Shutdown: abandon sends (and FloodWait sleeps) instead of waiting them out
+            for send in list(in_flight):
+                send.cancel()
+            await asyncio.gather(*in_flight, return_exceptions=True)
+            await self.pipeline.close()
+            raise
+
+        if not self.cancelled:
+            self.task.last_message_id = self._carry[0].id - 1 if self._carry else chunk[-1]
+
+    async def _finish(self):
+        """Drop any pending prefetch, stop the transfer pipeline and report the result."""
+        if self._next_fetch:
+            self._next_fetch.cancel()
+            self._next_fetch = None
+
+        await self.pipeline.close()
+
+        await self._report()
+
+    async def _fetch(self, message_ids: List[int]) -> List[Message]:
+        """Fetch a chunk of source messages in a single call."""
+        messages = await self.scheduler.call(
+            lambda: self.user_client.get_messages(self.task.source_chat, message_ids),
+            session=self.task.user_id
+        )
+        return messages if isinstance(messages, list) else [messages]
+
+    @staticmethod
+    def _open_album(messages: List[Message]) -> List[Message]:
+        """Get the trailing messages that share the last message's media group."""
+        if not messages or not messages[-1].media_group_id:
+            return []
+
+        group_id = messages[-1].media_group_id
+        start = len(messages)
+        while start > 0 and messages[start - 1].media_group_id == group_id:
+            start -= 1
+        return messages[start:]
+
+    def _plan(self, messages: List[Message]) -> List[List[Message]]:
+        """
+        Split a fetched chunk into send units.
+
+        Consecutive forwardable messages are coalesced into groups of up to
+        MAX_FORWARD_GROUP ids so they go out in one forward_messages call.
+        A group is closed before an album that would not fit, so media
+        groups are never split across calls. Every other message is a
+        unit of its own.
+        """
+        units: List[List[Message]] = []
+        group: List[Message] = []
+
+        def flush():
+            if group:
+                units.append(list(group))
+                group.clear()
+
+        index = 0
+        while index < len(messages):
+            msg = messages[index]
+
+            mode = classify_message(msg, self.protected, self.forward_mode)
+
+            if mode != TransferMode.FORWARD:
+                # Skipped messages send nothing, so they need not break a group
+                if mode != TransferMode.SKIP:
+                    flush()
+                units.append([msg])
+                index += 1
+                continue
+
+            # Take the whole album (or the single message) as one block
+            block = [msg]
+            if msg.media_group_id:
+                while (
+                    index + len(block) < len(messages)
+                    and messages[index + len(block)].media_group_id == msg.media_group_id
+                ):
+                    block.append(messages[index + len(block)])
+
+            if len(group) + len(block) > MAX_FORWARD_GROUP:
+                flush()
+
+            group.extend(block)
+            index += len(block)
+
+        flush()
+        return units
+
+    async def _send_unit(self, unit: List[Message], ticket: int):
+        """Send a unit, then let the units after it post."""
+        try:
+            if len(unit) > 1:
+                await self._forward_group(unit, ticket)
+            else:
+                await self._send(unit[0], ticket)
+        finally:
+            await self.sequencer.release(ticket)
+
+    async def _forward_group(self, group: List[Message], ticket: int):
+        """
+        Forward a group of messages in a single call.
+
+        Ids missing from the result are counted as failed. If the call is
+        rejected outright, the group falls back to per-message sends so
+        failures are still attributed to individual ids.
+        """
+        ids = [msg.id for msg in group]
+
+        try:
+            forwarded = await self._paced(
+                lambda: self.user_client.forward_messages(
+                    self.task.destination_chat,
+                    self.task.source_chat,
+                    ids
+                ),
+                ticket
+            )
+        except Exception as e:
+            logger.warning(
+                f"Grouped forward of {len(ids)} messages failed for task "
+                f"{self.task.task_id}, retrying one by one: {e}"
+            )
+            for msg in group:
+                await self._send(msg, ticket)
+            return
+
+        forwarded = forwarded if isinstance(forwarded, list) else [forwarded]
+        origins = {m.forward_from_message_id for m in forwarded if m.forward_from_message_id}
+
+        if origins:
+            missing = [i for i in ids if i not in origins]
+        else:
+            missing = ids[len(forwarded):]
+
+        if missing:
+            logger.warning(f"Messages {missing} were not forwarded for task {self.task.task_id}")
+
+        await self._record(failed=False, count=len(ids) - len(missing))
+        for _ in missing:
+            await self._record(failed=True)
+
+    async def _send(self, msg: Message, ticket: int):
+        """Deliver one message to the destination and record the outcome."""
+        mode = classify_message(msg, self.protected, self.forward_mode)
+
+        # Deleted and service messages cannot be copied; skip them quietly
+        if mode == TransferMode.SKIP:
+            await self._record(failed=False)
+            return
+
+        try:
+            if mode == TransferMode.DOWNLOAD:
+                await self._transfer(msg, ticket)
+            else:
+                await self._paced(lambda: self._deliver(msg, mode), ticket)
+        except Exception as e:
+            logger.warning(f"Failed to send message {msg.id} for task {self.task.task_id}: {e}")
+            await self._record(failed=True)
+            return
+
+        await self._record(failed=False)
+
+    async def _deliver(self, msg: Message, mode: TransferMode):
+        """Send a message using the given transfer mode."""
+        dest = self.task.destination_chat
+
+        if mode == TransferMode.FORWARD:
+            return await msg.forward(dest)
+
+        if not self.preserve_caption and msg.caption:
+            return await msg.copy(dest, caption="")
+
+        return await msg.copy(dest)
+
+    async def _transfer(self, msg: Message, ticket: int):
+        """
+        Re-upload a protected message's file through the transfer pipeline.
+
+        Only the final send waits for its turn and is retried on FloodWait;
+        the download and upload run ahead, and retrying them would move the
+        whole file again.
+        """
+        caption = msg.caption if self.preserve_caption else None
+        return await self.pipeline.submit(
+            msg,
+            self.task.destination_chat,
+            caption=caption,
+            send=lambda call: self._paced(call, ticket)
+        )
+
+    async def _paced(self, call: Callable[[], Awaitable[Any]], ticket: int) -> Any:
+        """Run a call to the destination in ticket order, through the flood scheduler."""
+        await self.sequencer.wait(ticket)
+        return await self.scheduler.call(
+            call,
+            session=self.task.user_id,
+            chat=self.task.destination_chat
+        )
+
+    async def _record(self, failed: bool, count: int = 1):
+        """Update task and status message progress."""
+        if count <= 0:
+            return
+
+        if self.owns_task:
+            self.queue_manager.update_progress(self.task.user_id, increment=count, failed=failed)
+
+        if self.tracker:
+            await self.tracker.update(increment=count, failed=failed)
+
+    async def _report(self):
+        """Edit the status message with the final result."""
+        if not self.status_message:
+            return
+
+        task = self.task
+        elapsed = 0
+        if task.started_at and task.completed_at:
+            elapsed = int((task.completed_at - task.started_at).total_seconds())
+
+        titles = {
+            TaskStatus.COMPLETED: "✅ **Batch Completed**",
+            TaskStatus.CANCELLED: "❌ **Batch Cancelled**",
+            TaskStatus.FAILED: "⚠️ **Batch Failed**",
+        }
+
+        text = (
+            f"{titles.get(task.status, '📊 **Batch Finished**')}\n\n"
+            f"✅ Processed: {task.current}/{task.total_messages}\n"
+            f"❌ Failed: {task.failed}\n"
+            f"⏱ Time: {get_readable_time(elapsed)}"
+        )
+
+        if task.error_message:
+            text += f"\n\nError: `{task.error_message}`"
+
+        try:
+            await self.status_message.edit_text(text)
+        except Exception as e:
+            logger.debug(f"Batch report error: {e}")
@@ -0,0 +1,211 @@
+"""
+Staged transfer pipeline overlapping downloads and uploads across messages.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, List, Optional
+
+from pyrogram import raw
+from pyrogram.types import Message
+
+from config import Config
+from .transfer import MediaTransfer
+
+logger = logging.getLogger(__name__)
+
+# Runs a send call, e.g. with FloodWait retries (FloodScheduler.call)
+SendWrapper = Callable[[Callable[[], Awaitable[Any]]], Awaitable[Any]]
+
+
+async def _send_directly(call: Callable[[], Awaitable[Any]]) -> Any:
+    return await call()
+
+
+@dataclass
+class TransferJob:
+    """One message moving through the pipeline."""
+    msg: Message
+    future: asyncio.Future
+    stream: bool = False
+    path: Optional[str] = None
+    thumb: Optional[str] = None
+    reserved: int = 0
+    files: List[str] = field(default_factory=list)
+    uploaded: Optional[raw.base.InputFile] = None
+    uploaded_thumb: Optional[raw.base.InputFile] = None
+
+
+class TransferPipeline:
+    """
+    Download -> thumbnail -> upload -> cleanup, with a worker pool per stage.
+
+    Stages are connected by bounded queues, so message N+1 downloads while
+    message N uploads, and a slow upload link holds back downloads instead
+    of filling the disk. A job that fails at any stage skips straight to
+    cleanup. Streamed jobs pass through the download and thumbnail stages
+    untouched and are streamed by an upload worker.
+
+    Workers only upload the file. The caller posts it afterwards, so posts
+    can be made in the caller's order without holding a worker or disk
+    space while they wait.
+    """
+
+    def __init__(self, media_transfer: MediaTransfer):
+        """
+        Initialize transfer pipeline.
+
+        Args:
+            media_transfer: Transfer implementing the individual stages
+        """
+        self.media_transfer = media_transfer
+
+        size = max(1, Config.PIPELINE_QUEUE_SIZE)
+        self.downloads: asyncio.Queue = asyncio.Queue(maxsize=size)
+        self.thumbnails: asyncio.Queue = asyncio.Queue(maxsize=size)
+        self.uploads: asyncio.Queue = asyncio.Queue(maxsize=size)
+        self.cleanups: asyncio.Queue = asyncio.Queue()
+
+        self._workers: List[asyncio.Task] = []
+
+    def _start(self):
+        """Spawn the stage workers."""
+        stages = [
+            (self.downloads, self.thumbnails, self._download, Config.PIPELINE_DOWNLOAD_WORKERS),
+            (self.thumbnails, self.uploads, self._thumbnail, Config.PIPELINE_THUMB_WORKERS),
+            (self.uploads, self.cleanups, self._upload, Config.PIPELINE_UPLOAD_WORKERS),
+        ]
+
+        for inbox, outbox, handler, workers in stages:
+            for _ in range(max(1, workers)):
+                self._workers.append(asyncio.create_task(self._stage(inbox, outbox, handler)))
+
+        self._workers.append(asyncio.create_task(self._cleanup()))
+
+    async def submit(
+        self,
+        msg: Message,
+        chat_id: int,
+        caption: Optional[str] = None,
+        send: SendWrapper = _send_directly
+    ) -> Message:
+        """
+        Transfer a message through the pipeline.
+
+        Files re-uploaded before are resent by file_id without entering it.
+
+        Args:
+            msg: Source message with downloadable media
+            chat_id: Destination chat ID
+            caption: Caption to use, None to drop it
+            send: Wrapper for the calls that post to the destination, e.g.
+                to order and retry them. It never wraps the download or the
+                file upload.
+
+        Returns:
+            The sent message
+        """
+        file_id = await self.media_transfer.cached_file_id(msg)
+        if file_id:
+            sent = await send(
+                lambda: self.media_transfer.send_cached(msg, chat_id, file_id, caption=caption)
+            )
+            if sent:
+                return sent
+
+        if not self._workers:
+            self._start()
+
+        job = TransferJob(msg=msg, future=asyncio.get_running_loop().create_future())
+        await self.downloads.put(job)
+        await job.future
+
+        sent = await send(
+            lambda: self.media_transfer.send_uploaded(
+                msg,
+                chat_id,
+                job.uploaded,
+                job.uploaded_thumb,
+                caption=caption
+            )
+        )
+        await self.media_transfer.remember(msg, sent)
+        return sent
+
+    async def _stage(
+        self,
+        inbox: asyncio.Queue,
+        outbox: asyncio.Queue,
+        handler: Callable[[TransferJob], Awaitable[None]]
+    ):
+        """Run one stage's jobs, passing finished or failed ones along."""
+        while True:
+            job: TransferJob = await inbox.get()
+
+            # The caller may have given up (cancelled) while the job waited
+            if not job.future.done():
+                try:
+                    await handler(job)
+                except Exception as e:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+
+            await (self.cleanups if job.future.done() else outbox).put(job)
+
+    async def _download(self, job: TransferJob):
+        reserved = None
+        if not self.media_transfer.streamer.can_stream(job.msg):
+            reserved = await self.media_transfer.admit(job.msg)
+
+        if reserved is None:
+            job.stream = True
+            return
+
+        job.reserved = reserved
+        job.path = await self.media_transfer.download(job.msg)
+        job.files.append(job.path)
+
+    async def _thumbnail(self, job: TransferJob):
+        if job.stream:
+            return
+
+        # Thumbnails live in the shared cache, so they are not cleaned up with the job
+        job.thumb = await self.media_transfer.thumbnail(job.msg, job.path)
+
+    async def _upload(self, job: TransferJob):
+        if job.stream:
+            job.uploaded, job.uploaded_thumb = await self.media_transfer.streamer.upload(job.msg)
+        else:
+            job.uploaded, job.uploaded_thumb = await self.media_transfer.upload(
+                job.msg,
+                job.path,
+                thumb=job.thumb
+            )
+
+        if not job.future.done():
+            job.future.set_result(None)
+
+    async def _cleanup(self):
+        """Delete the local files of finished jobs."""
+        while True:
+            job: TransferJob = await self.cleanups.get()
+            try:
+                await self.media_transfer.cleanup(job.files)
+            except Exception as e:
+                logger.warning(f"Cleanup failed for message {job.msg.id}: {e}")
+            finally:
+                await self.media_transfer.budget.release(job.reserved)
+
+    async def close(self):
+        """Stop the workers once no job is in flight."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        # Files of jobs finished just before the cleanup worker stopped
+        while not self.cleanups.empty():
+            job = self.cleanups.get_nowait()
+            await self.media_transfer.cleanup(job.files)
+            await self.media_transfer.budget.release(job.reserved)
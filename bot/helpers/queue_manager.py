@@ -4,11 +4,14 @@ Task queue manager for batch operations.
 
 import asyncio
 import logging
-from typing import Dict, Optional, Callable, Any
-from dataclasses import dataclass, field
+from collections import deque
+from typing import Deque, Dict, List, Optional, Callable, Any, Protocol, Set, Tuple
+from dataclasses import dataclass, field, fields, asdict
 from datetime import datetime
 from enum import Enum
 
+from config import Config
+
 logger = logging.getLogger(__name__)
 
 
@@ -45,19 +48,189 @@ class Task:
     # Runtime data
     status_message_id: Optional[int] = None
     error_message: Optional[str] = None
+    
+    # Checkpoint: last message id of the last fully processed chunk
+    last_message_id: Optional[int] = None
+    
+    def to_doc(self) -> Dict[str, Any]:
+        """Serialize task for the tasks collection."""
+        doc = asdict(self)
+        doc["status"] = self.status.value
+        return doc
+    
+    @classmethod
+    def from_doc(cls, doc: Dict[str, Any]) -> "Task":
+        """Rebuild a task from a tasks collection document."""
+        names = {f.name for f in fields(cls)}
+        data = {k: v for k, v in doc.items() if k in names}
+        data["status"] = TaskStatus(data.get("status", TaskStatus.PENDING.value))
+        return cls(**data)
+
+
+class TaskJob(Protocol):
+    """Work unit run by the queue manager's workers."""
+    
+    async def step(self) -> bool:
+        """Run one slice of work, returning True when finished."""
+        ...
 
 
 class QueueManager:
     """
     Manages task queues for batch operations.
     Ensures one active task per user.
+    
+    Submitted jobs run on a fixed pool of workers. Each worker runs one
+    slice of a job and puts it back at the end of the queue, so users
+    are served round-robin and a long batch cannot starve short ones.
     """
     
-    def __init__(self):
+    def __init__(self, max_concurrent: int = None):
         """Initialize queue manager."""
         self.tasks: Dict[int, Task] = {}  # user_id -> Task
         self.locks: Dict[int, asyncio.Lock] = {}
         self._cleanup_task: Optional[asyncio.Task] = None
+        
+        # Checkpoint store (TasksDB), attached once the database is connected
+        self.store = None
+        
+        # Scheduling
+        self.max_concurrent: int = max(1, max_concurrent or Config.MAX_CONCURRENT_TASKS)
+        # A cancelled job may still be finishing its slice when the user
+        # submits a new one, so queue entries carry the job itself.
+        self.jobs: Dict[int, TaskJob] = {}  # user_id -> latest job
+        self.ready: Deque[Tuple[int, TaskJob]] = deque()  # waiting for a worker
+        self.running: Set[Tuple[int, TaskJob]] = set()  # currently on a worker
+        self._wakeup: Optional[asyncio.Condition] = None
+        self._workers: List[asyncio.Task] = []
+    
+    async def start(self):
+        """Start the worker pool."""
+        if self._workers:
+            return
+        
+        self._wakeup = asyncio.Condition()
+        self._workers = [
+            asyncio.create_task(self._worker(i))
+            for i in range(self.max_concurrent)
+        ]
+        logger.info(f"Queue manager started with {self.max_concurrent} workers")
+    
+    async def stop(self, timeout: float = 10):
+        """
+        Stop the worker pool.
+        
+        Args:
+            timeout: Seconds to wait for cancelled workers to wind down
+        """
+        for worker in self._workers:
+            worker.cancel()
+        
+        if self._workers:
+            _, pending = await asyncio.wait(self._workers, timeout=timeout)
+            if pending:
+                logger.warning(f"{len(pending)} queue workers did not stop within {timeout}s")
+        self._workers = []
+    
+    async def submit(self, user_id: int, job: TaskJob) -> int:
+        """
+        Queue a job for the user's task.
+        
+        Args:
+            user_id: User ID owning the task
+            job: Job to run
+            
+        Returns:
+            Queue position (1 = next to run)
+        """
+        self.jobs[user_id] = job
+        await self._enqueue(user_id, job)
+        return self.get_queue_position(user_id)
+    
+    async def _enqueue(self, user_id: int, job: TaskJob):
+        """Put a job at the back of the ready queue and wake a worker."""
+        self.ready.append((user_id, job))
+        
+        if self._wakeup:
+            async with self._wakeup:
+                self._wakeup.notify()
+    
+    async def _worker(self, index: int):
+        """Take jobs round-robin and run one slice at a time."""
+        while True:
+            async with self._wakeup:
+                await self._wakeup.wait_for(lambda: bool(self.ready))
+                user_id, job = self.ready.popleft()
+            
+            self.running.add((user_id, job))
+            try:
+                done = await job.step()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Worker {index} job error for user {user_id}: {e}")
+                # A superseded job must not fail the user's new task
+                if self.jobs.get(user_id) is job:
+                    self.fail_task(user_id, str(e))
+                done = True
+            finally:
+                self.running.discard((user_id, job))
+            
+            self._persist(user_id)
+            
+            if done:
+                if self.jobs.get(user_id) is job:
+                    del self.jobs[user_id]
+            else:
+                await self._enqueue(user_id, job)
+    
+    def _persist(self, user_id: int):
+        """Buffer a checkpoint of the user's task, if a store is attached."""
+        task = self.tasks.get(user_id)
+        if task and self.store:
+            self.store.checkpoint(task.to_doc())
+    
+    def restore_task(self, task: Task) -> bool:
+        """
+        Re-register a task loaded from the database.
+        
+        Args:
+            task: Task rebuilt from its last checkpoint
+            
+        Returns:
+            False if the user already has an active task
+        """
+        if self.has_active_task(task.user_id):
+            return False
+        
+        task.status = TaskStatus.PENDING
+        self.tasks[task.user_id] = task
+        logger.info(f"Restored task {task.task_id} for user {task.user_id}")
+        return True
+    
+    def get_queue_position(self, user_id: int) -> int:
+        """
+        Get user's position in the ready queue.
+        
+        Returns:
+            0 if running or not queued, otherwise 1-based position
+        """
+        job = self.jobs.get(user_id)
+        if not job or (user_id, job) in self.running:
+            return 0
+        
+        for position, entry in enumerate(self.ready, start=1):
+            if entry == (user_id, job):
+                return position
+        return 0
+    
+    def get_queue_stats(self) -> dict:
+        """Get scheduler statistics."""
+        return {
+            "workers": self.max_concurrent,
+            "running": len(self.running),
+            "waiting": len(self.ready)
+        }
     
     def get_lock(self, user_id: int) -> asyncio.Lock:
         """Get or create lock for user."""
@@ -108,6 +281,7 @@ class QueueManager:
         )
         
         self.tasks[user_id] = task
+        self._persist(user_id)
         logger.info(f"Created task {task.task_id} for user {user_id}")
         
         return task
@@ -117,7 +291,8 @@ class QueueManager:
         task = self.tasks.get(user_id)
         if task and task.status == TaskStatus.PENDING:
             task.status = TaskStatus.RUNNING
-            task.started_at = datetime.now()
+            task.started_at = task.started_at or datetime.now()
+            self._persist(user_id)
             return True
         return False
     
@@ -140,6 +315,7 @@ class QueueManager:
         if task:
             task.status = TaskStatus.COMPLETED
             task.completed_at = datetime.now()
+            self._persist(user_id)
             logger.info(f"Task {task.task_id} completed")
     
     def fail_task(self, user_id: int, error: str = None):
@@ -149,6 +325,7 @@ class QueueManager:
             task.status = TaskStatus.FAILED
             task.completed_at = datetime.now()
             task.error_message = error
+            self._persist(user_id)
             logger.error(f"Task {task.task_id} failed: {error}")
     
     def cancel_task(self, user_id: int) -> bool:
@@ -157,6 +334,7 @@ class QueueManager:
         if task and task.status in [TaskStatus.PENDING, TaskStatus.RUNNING]:
             task.status = TaskStatus.CANCELLED
             task.completed_at = datetime.now()
+            self._persist(user_id)
             logger.info(f"Task {task.task_id} cancelled")
             return True
         return False
@@ -0,0 +1,199 @@
+"""
+Streaming transfer: pipe a download straight into an upload.
+"""
+
+import math
+import asyncio
+import logging
+from typing import AsyncIterator, List, Optional, Tuple
+
+from pyrogram import Client, raw
+from pyrogram.enums import MessageMediaType
+from pyrogram.errors import FloodWait
+from pyrogram.session import Session
+from pyrogram.types import Message
+
+from config import Config
+from .thumbnail import ThumbnailResolver
+
+logger = logging.getLogger(__name__)
+
+# Upload part size; Telegram allows at most 512 KiB per part
+PART_SIZE = 512 * 1024
+
+# Files above this size use the big-file upload, which needs no checksum
+BIG_FILE_SIZE = 10 * 1024 * 1024
+
+# Attempts per part before the upload is abandoned
+PART_RETRIES = 3
+
+# Media types sent as documents, which is what the streamed upload builds
+STREAMABLE_MEDIA = {
+    MessageMediaType.VIDEO,
+    MessageMediaType.DOCUMENT,
+    MessageMediaType.AUDIO,
+    MessageMediaType.ANIMATION,
+    MessageMediaType.VOICE,
+}
+
+
+class MediaStreamer:
+    """
+    Re-upload a message's file without storing it on disk.
+
+    Chunks from stream_media are cut into upload parts and handed to a few
+    upload workers through a bounded queue, so the download is throttled to
+    the upload speed and at most STREAM_BUFFER_PARTS parts are held in
+    memory. The upload starts as soon as the first part arrives.
+
+    Only the file is uploaded here; MediaTransfer.send_uploaded() posts it.
+    """
+
+    def __init__(self, client: Client, thumbs: ThumbnailResolver):
+        """
+        Initialize media streamer.
+
+        Args:
+            client: User client used to download and upload
+            thumbs: Resolver for the uploaded thumbnail
+        """
+        self.client = client
+        self.thumbs = thumbs
+
+    @staticmethod
+    def can_stream(msg: Message, forced: bool = False) -> bool:
+        """
+        Check if a message's file is large and of a kind worth streaming.
+
+        Args:
+            msg: Source message
+            forced: Ignore STREAM_TRANSFER (used when disk space runs out)
+        """
+        if not (Config.STREAM_TRANSFER or forced) or msg.media not in STREAMABLE_MEDIA:
+            return False
+
+        media = getattr(msg, msg.media.name.lower(), None)
+        return bool(media and (media.file_size or 0) > BIG_FILE_SIZE)
+
+    async def upload(self, msg: Message) -> Tuple[raw.types.InputFileBig, Optional[raw.base.InputFile]]:
+        """
+        Stream a message's file (and its thumbnail) to Telegram's servers.
+
+        Args:
+            msg: Source message with streamable media
+
+        Returns:
+            Uploaded file and thumbnail, to pass to MediaTransfer.send_uploaded()
+        """
+        media = getattr(msg, msg.media.name.lower())
+
+        # No local file to decode a frame from, so only cached or embedded thumbnails
+        thumb_path = await self.thumbs.resolve(msg)
+        thumb = await self.client.save_file(thumb_path) if thumb_path else None
+        uploaded = await self._upload(msg, media.file_size, self._file_name(msg, media))
+
+        return uploaded, thumb
+
+    @staticmethod
+    def _file_name(msg: Message, media) -> str:
+        """Name the uploaded file after the source."""
+        return getattr(media, "file_name", None) or f"{msg.media.name.lower()}_{msg.id}"
+
+    async def _parts(self, msg: Message) -> AsyncIterator[bytes]:
+        """Re-cut downloaded chunks into upload-sized parts."""
+        buffer = bytearray()
+
+        async for chunk in self.client.stream_media(msg):
+            buffer += chunk
+            while len(buffer) >= PART_SIZE:
+                yield bytes(buffer[:PART_SIZE])
+                del buffer[:PART_SIZE]
+
+        if buffer:
+            yield bytes(buffer)
+
+    async def _upload(self, msg: Message, file_size: int, file_name: str) -> raw.types.InputFileBig:
+        """Upload the streamed parts on a media session."""
+        total_parts = math.ceil(file_size / PART_SIZE)
+        file_id = self.client.rnd_id()
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, Config.STREAM_BUFFER_PARTS))
+        errors: List[Exception] = []
+
+        session = Session(
+            self.client,
+            await self.client.storage.dc_id(),
+            await self.client.storage.auth_key(),
+            await self.client.storage.test_mode(),
+            is_media=True
+        )
+        await session.start()
+
+        workers = [
+            asyncio.create_task(self._upload_worker(session, queue, file_id, total_parts, errors))
+            for _ in range(max(1, Config.STREAM_UPLOAD_WORKERS))
+        ]
+
+        try:
+            parts = 0
+            async for data in self._parts(msg):
+                if errors:
+                    raise errors[0]
+                await queue.put((parts, data))
+                parts += 1
+
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+
+            if errors:
+                raise errors[0]
+            if parts != total_parts:
+                raise ValueError(f"Streamed {parts}/{total_parts} parts of message {msg.id}")
+
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            await session.stop()
+
+        return raw.types.InputFileBig(id=file_id, parts=total_parts, name=file_name)
+
+    @staticmethod
+    async def _upload_worker(
+        session: Session,
+        queue: asyncio.Queue,
+        file_id: int,
+        total_parts: int,
+        errors: List[Exception]
+    ):
+        """Upload parts from the queue until the end marker."""
+        while True:
+            item: Optional[Tuple[int, bytes]] = await queue.get()
+            if item is None:
+                return
+
+            # Keep draining after a failure so the producer never blocks
+            if errors:
+                continue
+
+            part, data = item
+            for _ in range(PART_RETRIES):
+                try:
+                    await session.invoke(
+                        raw.functions.upload.SaveBigFilePart(
+                            file_id=file_id,
+                            file_part=part,
+                            file_total_parts=total_parts,
+                            bytes=data
+                        )
+                    )
+                    break
+                except FloodWait as e:
+                    error = e
+                    await asyncio.sleep(e.value)
+                except Exception as e:
+                    error = e
+                    logger.debug(f"Upload of part {part} failed: {e}")
+            else:
+                errors.append(error)
@@ -9,6 +9,9 @@ from typing import Optional
 
 import cv2
 from PIL import Image
+from pyrogram import Client
+from pyrogram.enums import MessageMediaType
+from pyrogram.types import Message
 
 from config import Config
 
@@ -166,3 +169,98 @@ class ThumbnailGenerator:
         except Exception as e:
             logger.error(f"Image resize error: {e}")
             return None
+
+
+class ThumbnailResolver:
+    """
+    Find a thumbnail for re-uploaded media as cheaply as possible.
+    
+    Thumbnails are kept in THUMB_CACHE_PATH under the source file's
+    file_unique_id. A cache miss is filled from the thumbnail Telegram
+    already has for the source, and only videos without one fall back to
+    decoding a frame with OpenCV. Cache hits refresh the file's age, so
+    the scheduled cleanup removes the least recently used entries.
+    
+    Returned paths belong to the cache and must not be deleted by callers.
+    """
+    
+    # Media types whose upload accepts a thumbnail
+    THUMB_MEDIA = {
+        MessageMediaType.VIDEO,
+        MessageMediaType.DOCUMENT,
+        MessageMediaType.AUDIO,
+        MessageMediaType.ANIMATION,
+    }
+    
+    def __init__(self, client: Client):
+        """
+        Initialize thumbnail resolver.
+        
+        Args:
+            client: Client used to download source thumbnails
+        """
+        self.client = client
+    
+    async def resolve(self, msg: Message, video_path: Optional[str] = None) -> Optional[str]:
+        """
+        Get a thumbnail for a message's media.
+        
+        Args:
+            msg: Source message
+            video_path: Downloaded video file, enables OpenCV extraction
+            
+        Returns:
+            Path to the cached thumbnail or None
+        """
+        if msg.media not in self.THUMB_MEDIA:
+            return None
+        
+        media = getattr(msg, msg.media.name.lower(), None)
+        if not media:
+            return None
+        
+        path = os.path.join(Config.THUMB_CACHE_PATH, f"{media.file_unique_id}.jpg")
+        
+        if os.path.exists(path):
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            return path
+        
+        # Write under a temporary name so concurrent resolvers never see a partial file
+        tmp_path = f"{path}.{msg.id}.tmp"
+        
+        thumb = await self._download_embedded(media, tmp_path)
+        if not thumb and video_path and msg.media == MessageMediaType.VIDEO:
+            thumb = await ThumbnailGenerator.generate_video_thumbnail(
+                video_path,
+                output_path=tmp_path
+            )
+        
+        if not thumb:
+            return None
+        
+        try:
+            os.replace(thumb, path)
+            return path
+        except OSError as e:
+            logger.error(f"Error caching thumbnail: {e}")
+            return None
+    
+    async def _download_embedded(self, media, output_path: str) -> Optional[str]:
+        """Download the source's own thumbnail, if it has one small enough to upload."""
+        thumbs = [
+            t for t in getattr(media, "thumbs", None) or []
+            if max(t.width, t.height) <= max(ThumbnailGenerator.MAX_SIZE)
+        ]
+        if not thumbs:
+            return None
+        
+        thumb = max(thumbs, key=lambda t: t.width * t.height)
+        
+        try:
+            return await self.client.download_media(thumb.file_id, file_name=output_path)
+        except Exception as e:
+            logger.debug(f"Could not download embedded thumbnail: {e}")
+            return None
@@ -0,0 +1,381 @@
+"""
+Download and re-upload transfer for content-protected sources.
+"""
+
+import os
+import logging
+from typing import List, Optional, Tuple
+
+from pyrogram import Client, raw, types, utils
+from pyrogram.enums import MessageMediaType
+from pyrogram.types import Message
+from pyrogram.errors import FloodWait
+
+from config import Config
+from .cleanup import CleanupManager
+from .disk_budget import DiskBudget, disk_budget
+from .streaming import MediaStreamer
+from .thumbnail import ThumbnailResolver
+from .utils import sanitize_filename
+
+logger = logging.getLogger(__name__)
+
+# Media types that carry a downloadable file, mapped to their upload method
+UPLOAD_METHODS = {
+    MessageMediaType.PHOTO: "send_photo",
+    MessageMediaType.VIDEO: "send_video",
+    MessageMediaType.DOCUMENT: "send_document",
+    MessageMediaType.AUDIO: "send_audio",
+    MessageMediaType.VOICE: "send_voice",
+    MessageMediaType.ANIMATION: "send_animation",
+    MessageMediaType.VIDEO_NOTE: "send_video_note",
+    MessageMediaType.STICKER: "send_sticker",
+}
+
+# Upload methods that do not accept a caption
+NO_CAPTION_METHODS = {"send_video_note", "send_sticker"}
+
+
+def get_media(msg: Message):
+    """Get the file-carrying media object of a message, if any."""
+    if msg.media not in UPLOAD_METHODS:
+        return None
+    return getattr(msg, msg.media.name.lower(), None)
+
+
+class MediaTransfer:
+    """
+    Move a message's file by downloading and re-uploading it.
+
+    Only used when the source forbids server-side copies; everything
+    else goes through copy_message/forward_messages. Large documents are
+    streamed (see MediaStreamer); the rest pass through local disk.
+
+    Uploading a file and posting it are separate steps: the file is
+    uploaded first, then send_uploaded() posts it in one cheap call.
+    """
+
+    def __init__(
+        self,
+        client: Client,
+        user_id: int,
+        budget: Optional[DiskBudget] = None,
+        cache=None
+    ):
+        """
+        Initialize media transfer.
+
+        Args:
+            client: User client used to download and upload
+            user_id: Owner of the batch, used for per-user directories
+            budget: Download quota, the process-wide one if omitted
+            cache: MediaCacheDB of earlier re-uploads, skipped if omitted
+        """
+        self.client = client
+        self.user_id = user_id
+        self.budget = budget or disk_budget
+        self.cache = cache
+        self.download_dir = os.path.join(Config.DOWNLOAD_PATH, str(user_id))
+        self.thumbs = ThumbnailResolver(client)
+        self.streamer = MediaStreamer(client, self.thumbs)
+
+    def _file_path(self, msg: Message) -> str:
+        """Build a unique local path for a message's file."""
+        media = get_media(msg)
+        name = getattr(media, "file_name", None)
+
+        if not name:
+            ext = ".jpg" if msg.media == MessageMediaType.PHOTO else ""
+            name = f"{msg.media.name.lower()}{ext}"
+
+        return os.path.join(self.download_dir, f"{msg.id}_{sanitize_filename(name)}")
+
+    async def transfer(
+        self,
+        msg: Message,
+        chat_id: int,
+        caption: Optional[str] = None
+    ) -> Message:
+        """
+        Re-upload a message's file to a chat, one stage after the other.
+
+        Batches use TransferPipeline instead, which overlaps the stages of
+        consecutive messages.
+
+        Args:
+            msg: Source message with downloadable media
+            chat_id: Destination chat ID
+            caption: Caption to use, None to drop it
+
+        Returns:
+            The sent message
+        """
+        file_id = await self.cached_file_id(msg)
+        if file_id:
+            sent = await self.send_cached(msg, chat_id, file_id, caption=caption)
+            if sent:
+                return sent
+
+        reserved = None if self.streamer.can_stream(msg) else await self.admit(msg)
+        if reserved is None:
+            uploaded, thumb = await self.streamer.upload(msg)
+        else:
+            created = []
+            try:
+                path = await self.download(msg)
+                created.append(path)
+
+                thumb_path = await self.thumbnail(msg, path)
+                uploaded, thumb = await self.upload(msg, path, thumb=thumb_path)
+
+            finally:
+                await self.cleanup(created)
+                await self.budget.release(reserved)
+
+        sent = await self.send_uploaded(msg, chat_id, uploaded, thumb, caption=caption)
+        await self.remember(msg, sent)
+        return sent
+
+    async def cached_file_id(self, msg: Message) -> Optional[str]:
+        """Look up the file_id of an earlier re-upload of a message's file."""
+        media = get_media(msg)
+        if not self.cache or not media:
+            return None
+
+        return await self.cache.get_file_id(self.user_id, media.file_unique_id)
+
+    async def send_cached(
+        self,
+        msg: Message,
+        chat_id: int,
+        file_id: str,
+        caption: Optional[str] = None
+    ) -> Optional[Message]:
+        """
+        Send an earlier re-upload of a message's file.
+
+        A cached file_id that Telegram rejects is forgotten, and the
+        caller falls back to a full transfer.
+
+        Args:
+            msg: Source message
+            chat_id: Destination chat ID
+            file_id: Cached file_id from cached_file_id()
+            caption: Caption to use, None to drop it
+
+        Returns:
+            The sent message, or None if the file_id is no longer usable
+        """
+        kwargs = {}
+        if UPLOAD_METHODS[msg.media] not in NO_CAPTION_METHODS:
+            kwargs["caption"] = caption or ""
+            if caption and caption == msg.caption:
+                kwargs["caption_entities"] = msg.caption_entities
+
+        try:
+            return await self.client.send_cached_media(chat_id, file_id, **kwargs)
+        except FloodWait:
+            raise
+        except Exception as e:
+            logger.info(f"Cached file for message {msg.id} is no longer usable: {e}")
+            await self.cache.forget(self.user_id, get_media(msg).file_unique_id)
+            return None
+
+    async def remember(self, msg: Message, sent: Optional[Message]):
+        """Cache the file_id of a message's re-upload for later batches."""
+        source, copy = get_media(msg), get_media(sent) if sent else None
+        if self.cache and source and copy:
+            await self.cache.save(self.user_id, source.file_unique_id, copy.file_id, sent.chat.id)
+
+    async def admit(self, msg: Message) -> Optional[int]:
+        """
+        Reserve disk space for downloading a message's file.
+
+        When the budget is exhausted, files that can be streamed are
+        streamed instead; anything else waits for space to be released.
+
+        Returns:
+            Bytes reserved (release them after cleanup), or None to stream
+        """
+        media = get_media(msg)
+        size = self.budget.clamp(getattr(media, "file_size", None) or 0)
+
+        if self.budget.try_reserve(size):
+            return size
+
+        if self.streamer.can_stream(msg, forced=True):
+            logger.info(f"Download budget exhausted, streaming message {msg.id}")
+            return None
+
+        return await self.budget.reserve(size)
+
+    async def download(self, msg: Message) -> str:
+        """
+        Download a message's file to the user's download directory.
+
+        Returns:
+            Local file path
+        """
+        if msg.media not in UPLOAD_METHODS:
+            raise ValueError(f"Unsupported media type: {msg.media}")
+
+        os.makedirs(self.download_dir, exist_ok=True)
+
+        path = await self.client.download_media(msg, file_name=self._file_path(msg))
+        if not path:
+            raise ValueError(f"Could not download message {msg.id}")
+        return path
+
+    async def thumbnail(self, msg: Message, path: str) -> Optional[str]:
+        """
+        Find a thumbnail for a downloaded file (see ThumbnailResolver).
+
+        Returns:
+            Cached thumbnail path (not to be deleted), or None
+        """
+        return await self.thumbs.resolve(msg, video_path=path)
+
+    async def upload(
+        self,
+        msg: Message,
+        path: str,
+        thumb: Optional[str] = None
+    ) -> Tuple[raw.base.InputFile, Optional[raw.base.InputFile]]:
+        """
+        Upload a downloaded file to Telegram's servers without posting it.
+
+        Args:
+            msg: Source message
+            path: Local file path
+            thumb: Thumbnail path, used for media types that accept one
+
+        Returns:
+            Uploaded file and thumbnail, to pass to send_uploaded()
+        """
+        uploaded = await self.client.save_file(path)
+
+        thumb_file = None
+        if thumb and msg.media in ThumbnailResolver.THUMB_MEDIA:
+            thumb_file = await self.client.save_file(thumb)
+
+        return uploaded, thumb_file
+
+    async def send_uploaded(
+        self,
+        msg: Message,
+        chat_id: int,
+        uploaded: raw.base.InputFile,
+        thumb: Optional[raw.base.InputFile] = None,
+        caption: Optional[str] = None
+    ) -> Message:
+        """
+        Post an uploaded file as a copy of the source message.
+
+        Cheap to retry: the uploaded file stays on Telegram's servers.
+
+        Args:
+            msg: Source message
+            chat_id: Destination chat ID
+            uploaded: File from upload() or MediaStreamer.upload()
+            thumb: Uploaded thumbnail, if any
+            caption: Caption to use, None to drop it
+
+        Returns:
+            The sent message
+        """
+        media = get_media(msg)
+
+        if msg.media == MessageMediaType.PHOTO:
+            input_media = raw.types.InputMediaUploadedPhoto(file=uploaded)
+        else:
+            input_media = raw.types.InputMediaUploadedDocument(
+                file=uploaded,
+                thumb=thumb,
+                mime_type=getattr(media, "mime_type", None) or "application/octet-stream",
+                attributes=self._attributes(msg, media, uploaded.name)
+            )
+
+        if UPLOAD_METHODS[msg.media] in NO_CAPTION_METHODS:
+            caption = None
+        entities = msg.caption_entities if caption and caption == msg.caption else None
+
+        r = await self.client.invoke(
+            raw.functions.messages.SendMedia(
+                peer=await self.client.resolve_peer(chat_id),
+                media=input_media,
+                random_id=self.client.rnd_id(),
+                **await utils.parse_text_entities(self.client, caption, None, entities)
+            )
+        )
+
+        for update in r.updates:
+            if isinstance(update, (raw.types.UpdateNewMessage, raw.types.UpdateNewChannelMessage)):
+                return await types.Message._parse(
+                    self.client,
+                    update.message,
+                    {u.id: u for u in r.users},
+                    {c.id: c for c in r.chats}
+                )
+
+        raise ValueError(f"No message returned for upload of message {msg.id}")
+
+    @staticmethod
+    def _attributes(msg: Message, media, file_name: str) -> list:
+        """Build the document attributes describing the media."""
+        attributes = [raw.types.DocumentAttributeFilename(file_name=file_name)]
+
+        if msg.media in (MessageMediaType.VIDEO, MessageMediaType.ANIMATION):
+            attributes.append(raw.types.DocumentAttributeVideo(
+                duration=media.duration or 0,
+                w=media.width or 0,
+                h=media.height or 0,
+                supports_streaming=True
+            ))
+            if msg.media == MessageMediaType.ANIMATION:
+                attributes.append(raw.types.DocumentAttributeAnimated())
+
+        elif msg.media == MessageMediaType.VIDEO_NOTE:
+            attributes.append(raw.types.DocumentAttributeVideo(
+                duration=media.duration or 0,
+                w=media.length or 0,
+                h=media.length or 0,
+                round_message=True
+            ))
+
+        elif msg.media == MessageMediaType.STICKER:
+            # Not tied to the source set, which the account may not have access to
+            attributes.append(raw.types.DocumentAttributeSticker(
+                alt=media.emoji or "",
+                stickerset=raw.types.InputStickerSetEmpty()
+            ))
+            if media.is_video:
+                attributes.append(raw.types.DocumentAttributeVideo(
+                    duration=0,
+                    w=media.width or 512,
+                    h=media.height or 512
+                ))
+            else:
+                attributes.append(raw.types.DocumentAttributeImageSize(
+                    w=media.width or 512,
+                    h=media.height or 512
+                ))
+
+        elif msg.media == MessageMediaType.AUDIO:
+            attributes.append(raw.types.DocumentAttributeAudio(
+                duration=media.duration or 0,
+                performer=media.performer,
+                title=media.title
+            ))
+
+        elif msg.media == MessageMediaType.VOICE:
+            attributes.append(raw.types.DocumentAttributeAudio(
+                duration=media.duration or 0,
+                voice=True
+            ))
+
+        return attributes
+
+    @staticmethod
+    async def cleanup(paths: List[str]):
+        """Delete the local files of a finished transfer."""
+        await CleanupManager.delete_files([p for p in paths if p])
@@ -13,7 +13,7 @@ from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
 from pyrogram.errors import FloodWait, MessageIdInvalid, ChatAdminRequired
 
 from config import Config
-from bot.helpers.decorators import check_subscription, check_login, bot_enabled, rate_limit
+from bot.helpers.decorators import require
 from bot.helpers.progress import ProgressBar, BatchProgressTracker
 from bot.helpers.thumbnail import ThumbnailGenerator
 from bot.helpers.cleanup import CleanupManager
@@ -28,10 +28,7 @@ batch_states = {}
 
 
 @Client.on_message(filters.command("batch") & filters.private)
-@bot_enabled
-@check_subscription
-@check_login
-@rate_limit(max_calls=3, window_seconds=60)
+@require(login=True, rate=(3, 60))
 async def batch_command(client: Client, message: Message):
     """Handle /batch command to start batch forwarding."""
     user_id = message.from_user.id
@@ -39,10 +36,13 @@ async def batch_command(client: Client, message: Message):
     # Check for existing active task
     if client.queue_manager.has_active_task(user_id):
         task = client.queue_manager.get_task(user_id)
+        position = client.queue_manager.get_queue_position(user_id)
+        queue_line = f"Queue Position: {position}\n" if position else ""
         await message.reply_text(
             f"⚠️ You already have an active batch task!\n\n"
             f"Progress: {task.current}/{task.total_messages}\n"
-            f"Status: {task.status.value}\n\n"
+            f"Status: {task.status.value}\n"
+            f"{queue_line}\n"
             f"Use /cancel to stop the current task.",
             quote=True
         )
@@ -111,7 +111,7 @@ async def handle_source_input(client: Client, message: Message, state: dict):
     chat_id, msg_id = parsed
     
     # Verify access to the source
-    user_client = client.user_clients.get(user_id)
+    user_client = await client.user_clients.acquire(user_id)
     if not user_client:
         await message.reply_text(
             "❌ Session not active. Please /login again.",
@@ -168,8 +168,9 @@ async def handle_count_input(client: Client, message: Message, state: dict):
         
         state["count"] = count
         
-        # Get destination chat
-        dest_chat = await client.db.settings.get_destination_chat(user_id)
+        # Get destination chat and forwarding preferences
+        settings = await client.db.settings.get_settings(user_id)
+        dest_chat = settings.get("destination_chat_id")
         
         # Create task
         task = client.queue_manager.create_task(
@@ -182,4 +183,48 @@ async def handle_count_input(client: Client, message: Message, state: dict):
         
         if not task:
             await message.reply_text(
-                "❌ Could not 
+                "❌ Could not create task. You may already have an active task.",
+                quote=True
+            )
+            del batch_states[user_id]
+            return
+        
+        del batch_states[user_id]
+        
+        user_client = await client.user_clients.acquire(user_id)
+        if not user_client:
+            client.queue_manager.fail_task(user_id, "Session not active")
+            await message.reply_text(
+                "❌ Session not active. Please /login again.",
+                quote=True
+            )
+            return
+        
+        status_msg = await message.reply_text(
+            f"🚀 **Batch Queued**\n\n"
+            f"📨 Messages: {count}\n"
+            f"📤 Destination: `{dest_chat}`\n\n"
+            f"Use /cancel to stop.",
+            quote=True
+        )
+        task.status_message_id = status_msg.id
+        
+        position = await client.submit_batch(task, status_msg, settings)
+        
+        if position > 1:
+            try:
+                await status_msg.edit_text(
+                    f"🕒 **Batch Queued**\n\n"
+                    f"📨 Messages: {count}\n"
+                    f"📤 Destination: `{dest_chat}`\n"
+                    f"📍 Queue Position: {position}\n\n"
+                    f"Use /cancel to stop."
+                )
+            except Exception as e:
+                logger.debug(f"Queue position update error: {e}")
+        
+    except ValueError:
+        await message.reply_text(
+            "❌ Please enter a valid number.",
+            quote=True
+        )
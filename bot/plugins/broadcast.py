@@ -0,0 +1,64 @@
+"""
+Broadcast handler (owners only).
+"""
+
+import logging
+from datetime import datetime
+
+from pyrogram import Client, filters
+from pyrogram.types import Message
+
+from bot.helpers.decorators import require
+
+logger = logging.getLogger(__name__)
+
+
+@Client.on_message(filters.command("broadcast") & filters.private)
+@require(owner=True)
+async def broadcast_command(client: Client, message: Message):
+    """Handle /broadcast command: reply to a message to send it to all users."""
+    user_id = message.from_user.id
+    args = message.command[1:]
+
+    if args and args[0].lower() == "cancel":
+        if client.broadcaster and not client.broadcaster.cancelled:
+            client.broadcaster.cancel()
+            await message.reply_text("🛑 Broadcast will stop after the current batch.", quote=True)
+        else:
+            await message.reply_text("ℹ️ No broadcast is running.", quote=True)
+        return
+
+    if client.broadcaster:
+        await message.reply_text(
+            "⚠️ A broadcast is already running.\n\n"
+            "Use `/broadcast cancel` to stop it.",
+            quote=True
+        )
+        return
+
+    if not message.reply_to_message:
+        await message.reply_text(
+            "ℹ️ Reply to the message you want to broadcast with /broadcast.",
+            quote=True
+        )
+        return
+
+    broadcast_id = f"bc_{user_id}_{datetime.now().timestamp()}"
+
+    created = await client.db.broadcasts.create(
+        broadcast_id=broadcast_id,
+        from_chat_id=message.chat.id,
+        message_id=message.reply_to_message.id,
+        created_by=user_id
+    )
+
+    if not created:
+        await message.reply_text("❌ Could not start broadcast. Check the logs.", quote=True)
+        return
+
+    status_msg = await message.reply_text("📢 **Broadcast starting...**", quote=True)
+
+    await client.start_broadcast(
+        await client.db.broadcasts.get_broadcast(broadcast_id),
+        status_msg
+    )
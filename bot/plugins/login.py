@@ -15,7 +15,7 @@ from pyrogram.errors import (
 )
 
 from config import Config
-from bot.helpers.decorators import check_subscription, bot_enabled, rate_limit
+from bot.helpers.decorators import require
 from bot.helpers.utils import format_phone_number
 from strings.messages import Messages
 
@@ -26,9 +26,7 @@ login_states = {}
 
 
 @Client.on_message(filters.command("login") & filters.private)
-@bot_enabled
-@check_subscription
-@rate_limit(max_calls=5, window_seconds=300)
+@require(rate=(5, 300))
 async def login_command(client: Client, message: Message):
     """Handle /login command."""
     user_id = message.from_user.id
@@ -183,7 +181,7 @@ async def handle_otp_input(client: Client, message: Message, state: dict):
         )
         
         # Store client in active clients
-        client.user_clients[user_id] = user_client
+        client.user_clients.add(user_id, user_client)
         
         # Cleanup
         del login_states[user_id]
@@ -261,7 +259,7 @@ async def handle_2fa_input(client: Client, message: Message, state: dict):
         )
         
         # Store client
-        client.user_clients[user_id] = user_client
+        client.user_clients.add(user_id, user_client)
         
         # Cleanup
         del login_states[user_id]
@@ -7,7 +7,7 @@ from pyrogram import Client, filters
 from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
 
 from config import Config
-from bot.helpers.decorators import check_subscription, bot_enabled
+from bot.helpers.decorators import require
 from bot.helpers.cleanup import CleanupManager
 from strings.messages import Messages
 
@@ -15,8 +15,7 @@ logger = logging.getLogger(__name__)
 
 
 @Client.on_message(filters.command("logout") & filters.private)
-@bot_enabled
-@check_subscription
+@require()
 async def logout_command(client: Client, message: Message):
     """Handle /logout command."""
     user_id = message.from_user.id
@@ -63,13 +62,7 @@ async def confirm_logout(client: Client, callback: CallbackQuery):
         client.queue_manager.cancel_task(user_id)
         
         # Disconnect user client if active
-        if user_id in client.user_clients:
-            try:
-                await client.user_clients[user_id].stop()
-            except Exception as e:
-                logger.warning(f"Error stopping user client: {e}")
-            
-            del client.user_clients[user_id]
+        await client.user_clients.remove(user_id)
         
         # Delete session from database
         await client.db.sessions.delete_session(user_id)
@@ -12,7 +12,11 @@ from pyrogram.types import (
 )
 
 from config import Config
-from bot.helpers.decorators import check_subscription, bot_enabled
+from bot.helpers.decorators import (
+    require,
+    cache_subscription,
+    invalidate_subscription
+)
 from strings.messages import Messages
 
 logger = logging.getLogger(__name__)
@@ -49,15 +53,14 @@ def get_start_keyboard() -> InlineKeyboardMarkup:
 
 
 @Client.on_message(filters.command("start") & filters.private)
-@bot_enabled
-@check_subscription
+@require()
 async def start_command(client: Client, message: Message):
     """Handle /start command."""
     user = message.from_user
     user_id = user.id
     
-    # Add user to database
-    await client.db.users.add_user(
+    # Add user to database (buffered, flushed in bulk)
+    await client.db.users.record_activity(
         user_id=user_id,
         username=user.username,
         first_name=user.first_name,
@@ -107,7 +110,7 @@ async def start_command(client: Client, message: Message):
 
 
 @Client.on_callback_query(filters.regex("^back_to_start$"))
-@check_subscription
+@require(enabled=False)
 async def back_to_start(client: Client, callback: CallbackQuery):
     """Handle back to start callback."""
     user = callback.from_user
@@ -135,6 +138,9 @@ async def check_sub_callback(client: Client, callback: CallbackQuery):
     """Handle subscription check callback."""
     user_id = callback.from_user.id
     
+    # The user claims to have joined; never trust a cached "not joined"
+    invalidate_subscription(user_id)
+    
     try:
         member = await client.get_chat_member(
             f"@{Config.FORCE_SUB_CHANNEL}",
@@ -142,6 +148,7 @@ async def check_sub_callback(client: Client, callback: CallbackQuery):
         )
         
         if member.status not in ["left", "kicked"]:
+            cache_subscription(user_id, True)
             await callback.answer("✅ Verified! You can use the bot now.", show_alert=True)
             
             # Send start message
@@ -22,6 +22,7 @@ class Config:
     # MongoDB Configuration
     MONGO_DB_URL: str = os.environ.get("MONGO_DB_URL", "mongodb://localhost:27017")
     MONGO_DB_NAME: str = os.environ.get("MONGO_DB_NAME", "serena_forward")
+    STATS_CACHE_TTL: int = int(os.environ.get("STATS_CACHE_TTL", "60"))
     
     # Owner Configuration
     OWNER_IDS: List[int] = [
@@ -40,6 +41,9 @@ class Config:
     # Force Subscription
     FORCE_SUB_CHANNEL: str = os.environ.get("FORCE_SUB_CHANNEL", "serenaunzipbot")
     FORCE_SUB_LINK: str = f"https://t.me/{FORCE_SUB_CHANNEL}"
+    SUB_CACHE_TTL: int = int(os.environ.get("SUB_CACHE_TTL", "600"))
+    SUB_NEGATIVE_CACHE_TTL: int = int(os.environ.get("SUB_NEGATIVE_CACHE_TTL", "30"))
+    SUB_CACHE_SIZE: int = int(os.environ.get("SUB_CACHE_SIZE", "10000"))
     
     # Owner Contact Links
     OWNER_CONTACT_1: str = os.environ.get("OWNER_CONTACT_1", "https://t.me/technicalserena")
@@ -54,9 +58,53 @@ class Config:
     MAX_BATCH_LIMIT: int = int(os.environ.get("MAX_BATCH_LIMIT", "500"))
     FLOOD_WAIT_MULTIPLIER: float = float(os.environ.get("FLOOD_WAIT_MULTIPLIER", "1.5"))
     
+    # Batch Engine
+    BATCH_FETCH_SIZE: int = int(os.environ.get("BATCH_FETCH_SIZE", "200"))
+    BATCH_CONCURRENCY: int = int(os.environ.get("BATCH_CONCURRENCY", "4"))
+    MAX_CONCURRENT_TASKS: int = int(os.environ.get("MAX_CONCURRENT_TASKS", "5"))
+    TASK_CHECKPOINT_INTERVAL: float = float(os.environ.get("TASK_CHECKPOINT_INTERVAL", "5"))
+    
+    # Send Pacing (calls per second, adapted at runtime on FloodWait)
+    SESSION_SEND_RATE: float = float(os.environ.get("SESSION_SEND_RATE", "3"))
+    CHAT_SEND_RATE: float = float(os.environ.get("CHAT_SEND_RATE", "3"))
+    SEND_BURST: int = int(os.environ.get("SEND_BURST", "5"))
+    
+    # Media Transfer (protected sources)
+    STREAM_TRANSFER: bool = os.environ.get("STREAM_TRANSFER", "true").lower() == "true"
+    STREAM_BUFFER_PARTS: int = int(os.environ.get("STREAM_BUFFER_PARTS", "8"))
+    STREAM_UPLOAD_WORKERS: int = int(os.environ.get("STREAM_UPLOAD_WORKERS", "4"))
+    PIPELINE_DOWNLOAD_WORKERS: int = int(os.environ.get("PIPELINE_DOWNLOAD_WORKERS", "2"))
+    PIPELINE_THUMB_WORKERS: int = int(os.environ.get("PIPELINE_THUMB_WORKERS", "1"))
+    PIPELINE_UPLOAD_WORKERS: int = int(os.environ.get("PIPELINE_UPLOAD_WORKERS", "2"))
+    PIPELINE_QUEUE_SIZE: int = int(os.environ.get("PIPELINE_QUEUE_SIZE", "2"))
+    DOWNLOAD_QUOTA_MB: int = int(os.environ.get("DOWNLOAD_QUOTA_MB", "8192"))
+    
+    # Session Restore
+    SESSION_RESTORE_CONCURRENCY: int = int(os.environ.get("SESSION_RESTORE_CONCURRENCY", "10"))
+    SESSION_START_TIMEOUT: float = float(os.environ.get("SESSION_START_TIMEOUT", "30"))
+    
+    # User Client Pool
+    MAX_ACTIVE_CLIENTS: int = int(os.environ.get("MAX_ACTIVE_CLIENTS", "50"))
+    CLIENT_IDLE_TIMEOUT: float = float(os.environ.get("CLIENT_IDLE_TIMEOUT", "600"))
+    
+    # Settings Cache
+    SETTINGS_CACHE_TTL: int = int(os.environ.get("SETTINGS_CACHE_TTL", "300"))
+    SETTINGS_CACHE_SIZE: int = int(os.environ.get("SETTINGS_CACHE_SIZE", "5000"))
+    
+    # User Activity Write-Behind
+    ACTIVITY_FLUSH_INTERVAL: float = float(os.environ.get("ACTIVITY_FLUSH_INTERVAL", "5"))
+    ACTIVITY_FLUSH_SIZE: int = int(os.environ.get("ACTIVITY_FLUSH_SIZE", "500"))
+    USER_CURSOR_BATCH_SIZE: int = int(os.environ.get("USER_CURSOR_BATCH_SIZE", "1000"))
+    
+    # Broadcast
+    BROADCAST_RATE: float = float(os.environ.get("BROADCAST_RATE", "25"))
+    BROADCAST_CONCURRENCY: int = int(os.environ.get("BROADCAST_CONCURRENCY", "20"))
+    BROADCAST_WINDOW: int = int(os.environ.get("BROADCAST_WINDOW", "100"))
+    
     # Rate Limiting
     RATE_LIMIT_MESSAGES: int = int(os.environ.get("RATE_LIMIT_MESSAGES", "30"))
     RATE_LIMIT_WINDOW: int = int(os.environ.get("RATE_LIMIT_WINDOW", "60"))
+    RATE_LIMIT_CACHE_SIZE: int = int(os.environ.get("RATE_LIMIT_CACHE_SIZE", "10000"))
     
     # Session Encryption
     SESSION_ENCRYPTION_KEY: str = os.environ.get(
@@ -68,6 +116,8 @@ class Config:
     DOWNLOAD_PATH: str = os.environ.get("DOWNLOAD_PATH", "./downloads")
     THUMB_PATH: str = os.environ.get("THUMB_PATH", "./thumbnails")
     SESSION_PATH: str = os.environ.get("SESSION_PATH", "./sessions")
+    THUMB_CACHE_PATH: str = os.environ.get("THUMB_CACHE_PATH", "./thumbnails/cache")
+    THUMB_CACHE_MAX_AGE_HOURS: int = int(os.environ.get("THUMB_CACHE_MAX_AGE_HOURS", "168"))
     
     # Bot State
     BOT_ENABLED: bool = True
@@ -95,5 +145,5 @@ class Config:
 
 
 # Create directories if they don't exist
-for path in [Config.DOWNLOAD_PATH, Config.THUMB_PATH, Config.SESSION_PATH]:
+for path in [Config.DOWNLOAD_PATH, Config.THUMB_PATH, Config.SESSION_PATH, Config.THUMB_CACHE_PATH]:
     os.makedirs(path, exist_ok=True)
@@ -6,6 +6,7 @@ A production-ready Telegram forwarding bot with user session management.
 
 import asyncio
 import logging
+import signal
 import sys
 from datetime import datetime
 
@@ -30,6 +31,18 @@ logging.getLogger("pymongo").setLevel(logging.WARNING)
 
 async def main():
     """Main async entry point."""
+    started = False
+    
+    # Stop cleanly on SIGTERM/SIGINT so buffered writes are flushed
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            # Not available on Windows; Ctrl+C still raises KeyboardInterrupt
+            pass
+    
     try:
         # Validate configuration
         Config.validate()
@@ -44,15 +57,24 @@ async def main():
         logger.info("=" * 50)
         
         await bot.start()
+        started = True
         
-        # Keep the bot running
-        await asyncio.Event().wait()
+        # Keep the bot running until asked to stop
+        await stop_event.wait()
+        logger.info("Stop signal received")
         
     except KeyboardInterrupt:
         logger.info("Bot stopped by user")
     except Exception as e:
         logger.error(f"Fatal error: {e}", exc_info=True)
         sys.exit(1)
+    finally:
+        # Flush user activity and task checkpoints before exiting
+        if started:
+            try:
+                await bot.stop()
+            except Exception as e:
+                logger.error(f"Error during shutdown: {e}")
 
 
 if __name__ == "__main__":